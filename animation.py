@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import time
+
+FRAME_TIME = 1 / 30  # Longest a running animation waits between frames
+
+
+class Animation:
+    """A time-based effect that the Scheduler advances from the UI loop
+
+    Subclasses map the elapsed time to a state with state_at() and draw it
+    with draw(). draw() is only called when the state actually changes, so a
+    tick costs next to nothing between steps. duration is None for effects
+    that run until cancelled.
+    """
+
+    duration = None
+
+    def __init__(self, on_done=None):
+        self.start = None
+        self.last_state = None
+        self.done = False
+        self.on_done = on_done
+
+    def state_at(self, elapsed):
+        raise NotImplementedError
+
+    def next_change(self, elapsed):
+        """Seconds until state_at() returns something new"""
+        raise NotImplementedError
+
+    def draw(self, state):
+        raise NotImplementedError
+
+    def invalidate(self):
+        """Redraw on the next tick, e.g. after the screen was erased"""
+        self.last_state = None
+
+    def update(self, now):
+        elapsed = now - self.start
+        finished = self.duration is not None and elapsed >= self.duration
+        if finished:
+            elapsed = self.duration
+
+        drew = False
+        state = self.state_at(elapsed)
+        if state != self.last_state:
+            self.draw(state)
+            self.last_state = state
+            drew = True
+
+        if finished:
+            self.done = True
+            if self.on_done is not None:
+                self.on_done()
+                drew = True
+        return drew
+
+
+class Typewriter(Animation):
+    """Types text out one character every char_time seconds"""
+
+    def __init__(self, stdscr, y, x, text, attr, char_time=0.03, on_done=None):
+        super().__init__(on_done)
+        self.stdscr = stdscr
+        self.y = y
+        self.x = x
+        self.text = text
+        self.attr = attr
+        self.char_time = char_time
+        self.duration = len(text) * char_time
+
+    def state_at(self, elapsed):
+        return min(len(self.text), int(elapsed / self.char_time) + 1)
+
+    def next_change(self, elapsed):
+        return self.char_time - (elapsed % self.char_time)
+
+    def draw(self, shown):
+        self.stdscr.addstr(self.y, self.x, self.text[:shown], self.attr)
+
+
+class Blink(Animation):
+    """Calls draw(True) and draw(False) in turn, `times` times or forever"""
+
+    def __init__(self, draw, on_time, off_time, times=None, on_done=None):
+        super().__init__(on_done)
+        self.draw_visible = draw
+        self.on_time = on_time
+        self.off_time = off_time
+        if times is not None:
+            self.duration = times * (on_time + off_time)
+
+    def state_at(self, elapsed):
+        if self.duration is not None and elapsed >= self.duration:
+            return True  # Make sure it is visible at the end
+        return elapsed % (self.on_time + self.off_time) < self.on_time
+
+    def next_change(self, elapsed):
+        phase = elapsed % (self.on_time + self.off_time)
+        if phase < self.on_time:
+            return self.on_time - phase
+        return self.on_time + self.off_time - phase
+
+    def draw(self, visible):
+        self.draw_visible(visible)
+
+
+class ProgressBar(Animation):
+    """Fills a bar of `width` cells in `steps` even steps over duration seconds"""
+
+    def __init__(self, stdscr, y, x, width, attr, duration, steps=20, on_done=None):
+        super().__init__(on_done)
+        self.stdscr = stdscr
+        self.y = y
+        self.x = x
+        self.width = width
+        self.attr = attr
+        self.duration = duration
+        self.steps = steps
+
+    def state_at(self, elapsed):
+        step = min(self.steps, int(elapsed / self.duration * self.steps))
+        return int(step * self.width / self.steps)
+
+    def next_change(self, elapsed):
+        step_time = self.duration / self.steps
+        return step_time - (elapsed % step_time)
+
+    def draw(self, fill_width):
+        self.stdscr.addstr(self.y, self.x, "#" * fill_width + " " * (self.width - fill_width), self.attr)
+
+
+class Pause(Animation):
+    """Draws nothing for duration seconds, for waiting through play()"""
+
+    def __init__(self, duration, on_done=None):
+        super().__init__(on_done)
+        self.duration = duration
+
+    def state_at(self, elapsed):
+        return None
+
+    def next_change(self, elapsed):
+        return self.duration - elapsed
+
+    def draw(self, state):
+        pass
+
+
+class Scheduler:
+    """Advances every running animation from a single frame tick"""
+
+    def __init__(self):
+        self.animations = []
+
+    def add(self, animation):
+        animation.start = time.time()
+        self.animations.append(animation)
+        return animation
+
+    def cancel(self, animation):
+        if animation in self.animations:
+            self.animations.remove(animation)
+
+    def tick(self, now=None):
+        """Advance all animations, return True if anything was drawn"""
+        if now is None:
+            now = time.time()
+        drew = False
+        for animation in list(self.animations):
+            if animation.update(now):
+                drew = True
+            if animation.done:
+                self.animations.remove(animation)
+        return drew
+
+    def timeout(self, limit):
+        """How long the UI loop may wait for input before the next frame is due"""
+        now = time.time()
+        wait = limit
+        for animation in self.animations:
+            wait = min(wait, animation.next_change(now - animation.start))
+        return max(0.0, min(wait, limit))
+
+
+def play(stdscr, scheduler, *animations):
+    """Run animations to completion, still reading keys between frames
+
+    Keys pressed meanwhile are dropped rather than left in the input buffer
+    for whatever runs next.
+    """
+    for animation in animations:
+        scheduler.add(animation)
+    while True:
+        if scheduler.tick():
+            stdscr.noutrefresh()
+            stdscr.doupdate()
+        if all(animation.done for animation in animations):
+            return
+        stdscr.timeout(max(1, int(scheduler.timeout(FRAME_TIME) * 1000)))
+        stdscr.getch()
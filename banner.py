@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+
+# Rendered figlet banners, one plain text file per (text, font, pyfiglet version)
+BANNER_CACHE_DIR = "banner_cache"
+
+
+def pyfiglet_version():
+    """Installed pyfiglet version, read from package metadata without importing it"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return None
+    try:
+        return version("pyfiglet")
+    except PackageNotFoundError:
+        return None
+
+
+def cache_path(text, font, figlet_version):
+    key = "\0".join((text, font, figlet_version))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(BANNER_CACHE_DIR, f"{font}-{digest}.txt")
+
+
+def render_banner(text, font="small"):
+    """figlet_format(text, font) that only imports pyfiglet on a cache miss
+
+    Importing pyfiglet and loading a font is one of the slowest parts of
+    startup on the Pi, and the output never changes for the same inputs.
+    """
+    figlet_version = pyfiglet_version()
+    path = cache_path(text, font, figlet_version) if figlet_version else None
+    if path is not None:
+        try:
+            with open(path, 'r', encoding="utf-8") as f:
+                return f.read()
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+
+    import pyfiglet
+    rendered = pyfiglet.figlet_format(text, font=font)
+    if path is None:
+        return rendered  # No version to key the cache on
+
+    try:
+        os.makedirs(BANNER_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            f.write(rendered)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # A read-only SD card just means rendering every time
+    return rendered
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+import argparse
+import curses
+import fcntl
+import json
+import os
+import platform
+import pty
+import random
+import signal
+import statistics
+import struct
+import sys
+import tempfile
+import termios
+import time
+import traceback
+
+import main as wall
+import quote_journal
+from animation import Typewriter
+from banner import render_banner
+from pending_list import PendingList
+from quote_deck import QuoteDeck
+from quote_store import open_store, STATUS_FILES
+from renderer import WallScreen
+from terminal import CursesScreen, FrameBuffer
+
+# main.py ignores Ctrl+C for the kiosk, a benchmark should still stop on it
+signal.signal(signal.SIGINT, signal.default_int_handler)
+
+DEFAULT_SIZES = "1000,100000,1000000"
+DEFAULT_BACKENDS = "sqlite,json"
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# A result this much slower than the baseline counts as a regression, unless
+# it is only slower by less than NOISE_MS, which timer jitter alone can cause
+REGRESSION_RATIO = 1.2
+NOISE_MS = 0.05
+
+# Terminal the rendering benchmarks draw into
+SCREEN_SIZE = (30, 90)
+
+# Share of the synthetic quotes in each status
+STATUS_SHARES = (("approved", 0.70), ("pending", 0.25), ("removed", 0.05))
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Grace", "Linus", "Margaret", "Dennis", "Barbara", "Ken",
+    "Radia", "Guido", "Frances", "Edsger", "Hedy", "Claude", "Katherine", "Niklaus",
+]
+WORDS = [
+    "the", "future", "is", "mine", "truth", "found", "in", "simplicity", "code",
+    "never", "sleeps", "retro", "wall", "hello", "world", "keep", "it", "simple",
+    "make", "art", "not", "war", "pixels", "forever", "stay", "curious", "build",
+]
+
+
+def make_corpus(size, seed=1):
+    """size unique quotes within add_quote's limits, with a status each"""
+    rng = random.Random(seed)
+    corpus = {status: [] for status, _ in STATUS_SHARES}
+    for i in range(size):
+        name = f"{rng.choice(FIRST_NAMES)} {i}"  # The number keeps every quote unique
+        quote = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))[:30]
+        roll = rng.random()
+        for status, share in STATUS_SHARES:
+            roll -= share
+            if roll < 0:
+                break
+        corpus[status].append({"name": name, "quote": quote})
+    return corpus
+
+
+def write_corpus(corpus):
+    """Write the corpus as the JSON snapshot files, SQLite imports them on first open"""
+    for status, quotes in corpus.items():
+        with open(STATUS_FILES[status], 'w') as f:
+            json.dump(quotes, f)
+
+
+def measure(run, repeat, setup=None):
+    """Run run(setup()) repeat times, return the seconds each run took"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(backend, size, name, times):
+    return {
+        "backend": backend,
+        "size": size,
+        "name": name,
+        "runs": len(times),
+        "median_ms": round(statistics.median(times) * 1000, 4),
+        "min_ms": round(min(times) * 1000, 4),
+    }
+
+
+def bench_store(backend, size, repeat, report):
+    """Time loading, writing, the duplicate check and deck updates"""
+    rng = random.Random(2)
+    start = time.perf_counter()
+    store = open_store(backend)
+    report("first_open", [time.perf_counter() - start])  # Includes the JSON import for SQLite
+    store.close()
+
+    def load(_):
+        store = open_store(backend)
+        for status, _ in STATUS_SHARES:
+            store.quotes(status)
+        store.close()
+    # Forget the parsed JSON files so every run reads them, not just the first
+    report("load", measure(load, repeat, setup=quote_journal._snapshot_cache.clear))
+
+    store = open_store(backend)
+    approved = store.quotes("approved")
+    report("deck_build", measure(lambda _: QuoteDeck(approved), repeat))
+
+    submitted = iter(range(10 ** 9))
+    report("submit", measure(
+        lambda quote: store.submit(quote), repeat,
+        setup=lambda: {"name": "Bench", "quote": f"new quote {next(submitted)}"},
+    ))
+
+    def next_pending():
+        return store.quotes("pending")[0]
+    report("approve", measure(lambda quote: store.set_status(quote, "approved"), repeat, setup=next_pending))
+
+    batch = max(1, min(500, store.count("pending") // (repeat * 4)))
+    report(f"moderate_batch_{batch}", measure(
+        lambda quotes: store.set_status_many(quotes, "removed", from_status="pending"), repeat,
+        setup=lambda: list(store.quotes("pending")[:batch]),
+    ))
+
+    # The duplicate check add_quote's submit() does, against quotes in every state
+    known = [quote for status, _ in STATUS_SHARES
+             for quote in rng.sample(store.quotes(status), min(10, store.count(status)))]
+    report("duplicate_check_x1000", measure(
+        lambda _: [store.contains(known[i % len(known)]) for i in range(1000)], repeat,
+    ))
+
+    # check_for_quote_updates() after another process approved a few quotes
+    wall.QUOTE_STORE = store
+    deck = QuoteDeck(store.quotes("approved"))
+
+    def approve_some():
+        cursor = store.change_cursor()
+        store.set_status_many(list(store.quotes("pending")[:10]), "approved")
+        return cursor
+    report("check_for_quote_updates_10", measure(lambda cursor: wall.check_for_quote_updates(deck, cursor),
+                                                 repeat, setup=approve_some))
+    wall.QUOTE_STORE = None
+    store.close()
+
+
+def draw_wall(stdscr, screen, quote):
+    """What one pass of main()'s loop draws for a quote, typed out in full"""
+    screen.draw_chrome()
+    screen.clear_body()
+    center_y = (screen.border_top_y + screen.height - 3) // 2
+    attr = stdscr.color_pair(1) | curses.A_BOLD
+    Typewriter(stdscr, center_y - 1, (screen.width // 2) - (len(quote["quote"]) // 2),
+               quote["quote"], attr).draw(len(quote["quote"]))
+    name_line = f"- {quote['name']} -"
+    stdscr.addstr(center_y + 1, (screen.width // 2) - (len(name_line) // 2), name_line, attr)
+    screen.flush()
+
+
+def render_frames(stdscr, backend, repeat):
+    import admin  # Imported here, it draws with the colours main() sets up
+    stdscr.curs_set(0)
+    stdscr.start_color()
+    for pair, colour in enumerate((curses.COLOR_WHITE, curses.COLOR_YELLOW, curses.COLOR_GREEN,
+                                   curses.COLOR_RED, curses.COLOR_CYAN), 1):
+        stdscr.init_pair(pair, colour, curses.COLOR_BLACK)
+
+    store = open_store(backend)
+    screen = WallScreen(stdscr, render_banner("Retro Wall", font="small").splitlines())
+    # A different quote each frame, as on the wall, so curses has something to send
+    quotes = store.quotes("approved")[:16]
+    next_quote = iter(range(10 ** 9))
+    times = {}
+
+    def full_frame(_):
+        screen.invalidate()
+        draw_wall(stdscr, screen, quotes[next(next_quote) % len(quotes)])
+    times["wall_frame"] = measure(full_frame, repeat)
+    times["wall_quote"] = measure(lambda _: draw_wall(stdscr, screen, quotes[next(next_quote) % len(quotes)]),
+                                  repeat)
+
+    pending_list = PendingList(store)
+    pending_list.index = store.count("pending") // 2
+    times["admin_frame"] = measure(lambda _: admin.draw_admin_frame(stdscr, store, pending_list), repeat)
+
+    def scroll(_):
+        pending_list.handle_key(stdscr, curses.KEY_NPAGE)
+        admin.draw_admin_frame(stdscr, store, pending_list)
+    times["admin_page_down"] = measure(scroll, repeat)
+    store.close()
+    return times
+
+
+def bench_rendering(backend, size, repeat, report):
+    """Time frames in a real curses session on a pseudo-terminal, so no terminal is needed"""
+    read_fd, write_fd = os.pipe()
+    pid, master = pty.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            height, width = SCREEN_SIZE
+            fcntl.ioctl(sys.stdout.fileno(), termios.TIOCSWINSZ, struct.pack("HHHH", height, width, 0, 0))
+            os.environ["TERM"] = "xterm-256color"
+            message = {"times": curses.wrapper(
+                lambda window: render_frames(CursesScreen(window), backend, repeat))}
+        except BaseException:
+            message = {"error": traceback.format_exc()}
+        os.write(write_fd, json.dumps(message).encode())
+        os._exit(0)
+
+    os.close(write_fd)
+    # Drain the terminal output so the child never blocks writing it
+    while True:
+        try:
+            if not os.read(master, 64 * 1024):
+                break
+        except OSError:  # EIO once the child has exited
+            break
+    os.close(master)
+    data = b""
+    while True:
+        chunk = os.read(read_fd, 64 * 1024)
+        if not chunk:
+            break
+        data += chunk
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    message = json.loads(data or b'{"error": "the rendering process died"}')
+    if "error" in message:
+        raise RuntimeError(f"Rendering benchmark failed:\n{message['error']}")
+    for name, times in message["times"].items():
+        report(name, times)
+
+
+def bench_headless(backend, size, repeat, report):
+    """The same frames drawn into a FrameBuffer, rendering without the terminal's share"""
+    screen = FrameBuffer(*SCREEN_SIZE)
+    times = render_frames(screen, backend, repeat)
+    for name, frame_times in times.items():
+        report(f"{name}_headless", frame_times)
+    print(f"{backend:>6} {size:>8} {'headless bytes per update':<28} "
+          f"{screen.bytes_emitted / max(1, screen.updates):>10.1f}", file=sys.stderr)
+    screen.close()
+
+
+def run_benchmarks(sizes, backends, repeat):
+    results = []
+    home = os.getcwd()
+    for size in sizes:
+        corpus = make_corpus(size)
+        for backend in backends:
+            def report(name, times):
+                results.append(result(backend, size, name, times))
+                print(f"{backend:>6} {size:>8} {name:<28} {results[-1]['median_ms']:>10.3f} ms",
+                      file=sys.stderr)
+
+            with tempfile.TemporaryDirectory(prefix="retro-wall-bench-") as directory:
+                os.chdir(directory)
+                try:
+                    write_corpus(corpus)
+                    bench_store(backend, size, repeat, report)
+                    bench_rendering(backend, size, repeat * 10, report)
+                    bench_headless(backend, size, repeat * 10, report)
+                finally:
+                    os.chdir(home)
+    return results
+
+
+def compare(results, baseline):
+    """Print how results differ from a baseline run, return the number of regressions"""
+    before = {(r["backend"], r["size"], r["name"]): r for r in baseline["results"]}
+    regressions = 0
+    for r in results:
+        old = before.get((r["backend"], r["size"], r["name"]))
+        if old is None or not old["median_ms"]:
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        flag = ""
+        if ratio > REGRESSION_RATIO and r["median_ms"] - old["median_ms"] > NOISE_MS:
+            flag = "  SLOWER"
+            regressions += 1
+        print(f"{r['backend']:>6} {r['size']:>8} {r['name']:<28} "
+              f"{old['median_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the quote stores, deck updates and rendering on synthetic quotes")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated corpus sizes")
+    parser.add_argument("--backends", default=DEFAULT_BACKENDS, help="comma separated stores to time")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per store benchmark, frames get 10x")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results to check for regressions")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = args.backends.split(",")
+    results = run_benchmarks(sizes, backends, args.repeat)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if baseline is not None and compare(results, baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
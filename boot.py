@@ -1,28 +1,20 @@
 #!/usr/bin/env python3
 import curses
 import time
-import pyfiglet
-import random
 import os
-import sys
-import subprocess
+from animation import Scheduler, Blink, ProgressBar, Pause, play
+from banner import render_banner
 
 def blink_text(stdscr, y, text, color_pair, center_x, times=1, on_time=0.3, off_time=0.2):
     """Display text with a blinking effect"""
-    for _ in range(times):
-        # Display text
-        stdscr.addstr(y, center_x, text, color_pair | curses.A_BOLD)
-        stdscr.refresh()
-        time.sleep(on_time)
-        
-        # Clear text
-        stdscr.addstr(y, center_x, " " * len(text))
-        stdscr.refresh()
-        time.sleep(off_time)
-    
-    # Make sure text is visible at the end
-    stdscr.addstr(y, center_x, text, color_pair | curses.A_BOLD)
-    stdscr.refresh()
+    def draw(visible):
+        if visible:
+            stdscr.addstr(y, center_x, text, color_pair | curses.A_BOLD)
+        else:
+            stdscr.addstr(y, center_x, " " * len(text))
+
+    # Ends with the text visible
+    play(stdscr, Scheduler(), Blink(draw, on_time, off_time, times=times))
 
 def loading_animation(stdscr, y, width, color_pair, duration=2.0):
     """Display a simple loading bar animation"""
@@ -32,129 +24,218 @@ def loading_animation(stdscr, y, width, color_pair, duration=2.0):
     # Draw empty bar outline
     stdscr.addstr(y, start_x - 1, "[", color_pair)
     stdscr.addstr(y, start_x + bar_width, "]", color_pair)
-    stdscr.refresh()
     
-    # Fill the bar gradually
-    steps = 20
-    step_size = bar_width / steps
-    step_time = duration / steps
-    
-    for i in range(steps + 1):
-        fill_width = int(i * step_size)
-        stdscr.addstr(y, start_x, "#" * fill_width + " " * (bar_width - fill_width), color_pair)
-        stdscr.refresh()
-        time.sleep(step_time)
+    # Fill the bar gradually, keys are still read between frames
+    play(stdscr, Scheduler(), ProgressBar(stdscr, y, start_x, bar_width, color_pair, duration, steps=20))
+
+# Seconds each boot stage pauses for, per profile. The fast profile is used
+# when the wall was running a moment ago, e.g. after a crash or power blip.
+BOOT_PROFILES = {
+    "normal": {
+        "black_screen": 3.0,   # Black screen before showing the title
+        "title_pause": 1.0,    # After showing Retro Wall
+        "text_pause": 0.2,     # After the version and "System Initializing..."
+        "loading_bar": 2.0,    # Loading bar fill time
+        "component_pause": 0.5,  # Before each component's OK
+        "ready_pause": 0.3,    # Before and after SYSTEM READY
+        "ready_blinks": 3,
+        "closing_pause": 0.3,  # "Starting application..."
+    },
+    "fast": {
+        "black_screen": 0.0,
+        "title_pause": 0.2,
+        "text_pause": 0.0,
+        "loading_bar": 0.3,
+        "component_pause": 0.0,
+        "ready_pause": 0.0,
+        "ready_blinks": 1,
+        "closing_pause": 0.0,
+    },
+}
+
+# Touched when the wall starts, while it runs and when it stops, a recent mtime means a quick restart
+LAST_RUN_FILE = "last_run"
+FAST_BOOT_WINDOW = 10 * 60  # Seconds since the last run that still count as a restart
+MARK_RUNNING_INTERVAL = 2 * 60  # How often the running wall touches it, well inside the window
+
+# One line per boot with how long every stage took
+BOOT_TIMINGS_FILE = "boot_timings.log"
+
+def mark_running():
+    """Remember that the wall was up just now, see boot_profile()"""
+    try:
+        with open(LAST_RUN_FILE, 'a'):
+            pass
+        os.utime(LAST_RUN_FILE)
+    except OSError:
+        pass
+
+def boot_profile():
+    """Pick the boot profile: RETRO_WALL_BOOT if set, otherwise fast after a recent run"""
+    requested = os.environ.get("RETRO_WALL_BOOT")
+    if requested in BOOT_PROFILES:
+        return requested
+    try:
+        since_last_run = time.time() - os.path.getmtime(LAST_RUN_FILE)
+    except OSError:
+        return "normal"
+    return "fast" if 0 <= since_last_run < FAST_BOOT_WINDOW else "normal"
+
+def load_system_modules():
+    # The quote wall's own imports are most of the real start-up work
+    import main
+
+def check_quote_files():
+    import main
+    main.ensure_quote_files()
+
+# Real initialization work shown as "<label>... OK" lines
+BOOT_COMPONENTS = [
+    ("Loading system modules", load_system_modules),
+    ("Checking quote files", check_quote_files),
+]
+
+class Boot:
+    """What the boot stages share: the screen, the profile and where things were drawn"""
+
+    def __init__(self, stdscr, profile):
+        self.stdscr = stdscr
+        self.profile = profile
+        self.pauses = BOOT_PROFILES[profile]
+        self.height, self.width = stdscr.getmaxyx()
+        self.timings = []
+
+    def pause(self, name):
+        # Keys pressed meanwhile are read and dropped, as during the other effects
+        if self.pauses[name] > 0:
+            play(self.stdscr, Scheduler(), Pause(self.pauses[name]))
+
+    def center_x(self, text):
+        return (self.width // 2) - (len(text) // 2)
+
+def stage_black_screen(boot):
+    boot.stdscr.clear()
+    boot.stdscr.refresh()
+    boot.pause("black_screen")
+
+def stage_title(boot):
+    stdscr = boot.stdscr
 
-def boot_sequence(stdscr):
-    # Setup
-    curses.curs_set(0)  # Hide cursor
-    stdscr.timeout(100)  # Non-blocking getch
-    
-    # Colors
-    curses.start_color()
-    curses.init_pair(1, curses.COLOR_GREEN, curses.COLOR_BLACK)  # Matrix-style green text
-    curses.init_pair(2, curses.COLOR_YELLOW, curses.COLOR_BLACK) # Amber for status
-    curses.init_pair(3, curses.COLOR_WHITE, curses.COLOR_BLACK)  # White for title
-    curses.init_pair(4, curses.COLOR_RED, curses.COLOR_BLACK)    # Red for errors/warnings
-    
-    height, width = stdscr.getmaxyx()
-    
-    # Boot sequence
-    stdscr.clear()
-    
-    # 3 seconds of black screen before showing the title
-    time.sleep(3.0)
-    
     # Display title with figlet
-    ascii_title = pyfiglet.figlet_format("Retro Wall", font="small")
+    ascii_title = render_banner("Retro Wall", font="small")
     ascii_title_lines = ascii_title.splitlines()
-    
+
     # Display ASCII title with single blink-in effect
-    title_start_y = (height // 2) - (len(ascii_title_lines) // 2) - 6
-    
+    title_start_y = (boot.height // 2) - (len(ascii_title_lines) // 2) - 6
+
     # Display the title directly (blink in once from black)
     for i, line in enumerate(ascii_title_lines):
-        center_x = (width // 2) - (len(line) // 2)
-        stdscr.addstr(title_start_y + i, center_x, line, curses.color_pair(3) | curses.A_BOLD)
-    
+        stdscr.addstr(title_start_y + i, boot.center_x(line), line, stdscr.color_pair(3) | curses.A_BOLD)
+
     stdscr.refresh()
-    
-    # Wait 1 second after showing Retro Wall before continuing
-    time.sleep(1.0)
-    
+    boot.pause("title_pause")
+
     # Display version - directly below the title with no gap
     version_text = "v1.0"
-    version_y = title_start_y + len(ascii_title_lines)
-    stdscr.addstr(version_y, (width // 2) - (len(version_text) // 2), version_text, curses.color_pair(2))
+    boot.version_y = title_start_y + len(ascii_title_lines)
+    stdscr.addstr(boot.version_y, boot.center_x(version_text), version_text, stdscr.color_pair(2))
     stdscr.refresh()
-    time.sleep(0.2)
-    
+    boot.pause("text_pause")
+
+def stage_loading_bar(boot):
     # Show system initialization text
-    init_y = version_y + 2
+    boot.init_y = boot.version_y + 2
     init_text = "System Initializing..."
-    stdscr.addstr(init_y, (width // 2) - (len(init_text) // 2), init_text, curses.color_pair(1))
-    stdscr.refresh()
-    time.sleep(0.2)
-    
-    # Display loading bar (slower)
-    loading_animation(stdscr, init_y + 2, width, curses.color_pair(1), 2.0)
-    
-    # Display only one system component loading
-    components = [
-        "Loading system modules"
-    ]
-    
-    comp_y = init_y + 4
-    for i, component in enumerate(components):
+    boot.stdscr.addstr(boot.init_y, boot.center_x(init_text), init_text, boot.stdscr.color_pair(1))
+    boot.stdscr.refresh()
+    boot.pause("text_pause")
+
+    loading_animation(boot.stdscr, boot.init_y + 2, boot.width, boot.stdscr.color_pair(1), boot.pauses["loading_bar"])
+
+def stage_components(boot):
+    stdscr = boot.stdscr
+    comp_y = boot.init_y + 4
+    for i, (component, work) in enumerate(BOOT_COMPONENTS):
         comp_text = f"{component}... "
-        stdscr.addstr(comp_y + i, (width // 2) - 20, comp_text, curses.color_pair(1))
+        stdscr.addstr(comp_y + i, (boot.width // 2) - 20, comp_text, stdscr.color_pair(1))
         stdscr.refresh()
-        time.sleep(0.5)
-        stdscr.addstr(comp_y + i, (width // 2) - 20 + len(comp_text), "OK", curses.color_pair(2))
+        started = time.monotonic()
+        work()
+        boot.timings.append((component, time.monotonic() - started))
+        boot.pause("component_pause")
+        stdscr.addstr(comp_y + i, (boot.width // 2) - 20 + len(comp_text), "OK", stdscr.color_pair(2))
         stdscr.refresh()
-    
-    # Finalize boot sequence
-    time.sleep(0.3)
-    ready_y = comp_y + len(components) + 2
+    boot.ready_y = comp_y + len(BOOT_COMPONENTS) + 2
+
+def stage_ready(boot):
+    boot.pause("ready_pause")
     ready_text = "SYSTEM READY"
-    
-    # Make SYSTEM READY blink 3 times
+
+    # Make SYSTEM READY blink
     blink_text(
-        stdscr, 
-        ready_y, 
-        ready_text, 
-        curses.color_pair(2), 
-        (width // 2) - (len(ready_text) // 2),
-        times=3,
-        on_time=0.3, 
+        boot.stdscr,
+        boot.ready_y,
+        ready_text,
+        boot.stdscr.color_pair(2),
+        boot.center_x(ready_text),
+        times=boot.pauses["ready_blinks"],
+        on_time=0.3,
         off_time=0.2
     )
-    
+
     # Short pause before closing
-    time.sleep(0.3)
-    
+    boot.pause("ready_pause")
+
+def stage_closing(boot):
     # Closing boot splash
-    stdscr.clear()
+    boot.stdscr.clear()
     closing_text = "Starting application..."
-    stdscr.addstr(height // 2, (width // 2) - (len(closing_text) // 2), closing_text, curses.color_pair(3))
-    stdscr.refresh()
-    time.sleep(0.3)
+    boot.stdscr.addstr(boot.height // 2, boot.center_x(closing_text), closing_text, boot.stdscr.color_pair(3))
+    boot.stdscr.refresh()
+    boot.pause("closing_pause")
 
-if __name__ == "__main__":
-    # Run the boot sequence
-    curses.wrapper(boot_sequence)
-    
-    # After boot sequence, launch the main application
+# Run in this order, each one is timed separately
+BOOT_STAGES = [
+    ("black_screen", stage_black_screen),
+    ("title", stage_title),
+    ("loading_bar", stage_loading_bar),
+    ("components", stage_components),
+    ("ready", stage_ready),
+    ("closing", stage_closing),
+]
+
+def log_boot_timings(boot, total):
+    stages = ", ".join(f"{name} {seconds:.2f}" for name, seconds in boot.timings)
     try:
-        # Path to the main script
-        main_script = "./main.py"
-        
-        # Check if the script exists
-        if os.path.exists(main_script):
-            subprocess.run(["python3", main_script])
-        else:
-            print(f"Error: Main application script '{main_script}' not found.")
-            sys.exit(1)
-    except Exception as e:
-        print(f"Failed to start main application: {e}")
-        sys.exit(1)
\ No newline at end of file
+        with open(BOOT_TIMINGS_FILE, 'a') as f:
+            f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {boot.profile} boot {total:.2f} s: {stages}\n")
+    except OSError:
+        pass
+
+def boot_sequence(stdscr, profile=None):
+    """Run the boot stages, return the list of (stage, seconds) timings"""
+    # Setup
+    stdscr.curs_set(0)  # Hide cursor
+    stdscr.timeout(100)  # Non-blocking getch
+    
+    # Colors
+    stdscr.start_color()
+    stdscr.init_pair(1, curses.COLOR_GREEN, curses.COLOR_BLACK)  # Matrix-style green text
+    stdscr.init_pair(2, curses.COLOR_YELLOW, curses.COLOR_BLACK) # Amber for status
+    stdscr.init_pair(3, curses.COLOR_WHITE, curses.COLOR_BLACK)  # White for title
+    stdscr.init_pair(4, curses.COLOR_RED, curses.COLOR_BLACK)    # Red for errors/warnings
+
+    boot = Boot(stdscr, profile or boot_profile())
+    boot_start = time.monotonic()
+    for name, stage in BOOT_STAGES:
+        started = time.monotonic()
+        stage(boot)
+        boot.timings.append((name, time.monotonic() - started))
+    log_boot_timings(boot, time.monotonic() - boot_start)
+    mark_running()
+    return boot.timings
+
+if __name__ == "__main__":
+    # Boot straight into the wall in this process, without the splash
+    from init import run
+    run(show_splash=False)
@@ -1,9 +1,35 @@
 #!/usr/bin/env python3
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
 import time
+from collections import Counter
+
 import pexpect
 import random
 import os
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# How long a kiosk or the moderator may take to show a screen before it counts as stuck
+STARTUP_TIMEOUT = 60
+PROMPT_TIMEOUT = 10
+# After the kiosks are done the moderator keeps going until the queue is empty, at most this long
+DRAIN_TIMEOUT = 60
+# add_quote throws away keys for a second after showing the name prompt,
+# and the wall does the same after a new quote
+INPUT_PAUSE = 1.2
+# curses waits this long after ESC to tell it from an escape sequence
+ESC_WAIT = 1.5
+
+DEFAULT_MIX = "unique=0.8,duplicate=0.1,long=0.05,abandon=0.05"
+SUBMISSION_KINDS = ("unique", "duplicate", "long", "abandon")
+
+LOAD_WORDS = ["hello", "retro", "wall", "pixel", "dream", "code", "neon", "arcade", "fun", "joy", "beep"]
+
 def type_text(child, text, delay_range=(0.1, 0.4)):
     for char in text:
         child.send(char)
@@ -17,7 +43,7 @@ def press_key(child, key):
     else:
         child.send(key)
 
-def main():
+def run_demo():
     # Start main.py process
     child = pexpect.spawn("python3 main.py", encoding='utf-8')
 
@@ -52,10 +78,15 @@ def main():
     time.sleep(5)
 
     try:
-        key = input("Press 'd' to delete pending_quotes.json or any other key to send Shift+0: ").strip().lower()
+        key = input("Press 'd' to delete pending quotes or any other key to send Shift+0: ").strip().lower()
         if key == 'd':
-            if os.path.exists("pending_quotes.json"):
-                os.remove("pending_quotes.json")
+            # Through the store, wherever the backend keeps them
+            from quote_store import open_store
+            store = open_store()
+            try:
+                store.set_status_many(list(store.quotes("pending")), "removed", from_status="pending")
+            finally:
+                store.close()
             child.terminate()
         else:
             # Simulate Shift+0 as the character ')'
@@ -63,5 +94,310 @@ def main():
     except KeyboardInterrupt:
         child.terminate()
 
+class Ledger:
+    """What the kiosks typed in and when the store first showed each quote"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts = Counter()  # kind -> submissions tried
+        self.submitted = {}   # key -> time the kiosk pressed ENTER, quotes that must be stored once
+        self.repeated = set()  # keys submitted again, which must still be stored only once
+        self.abandoned = set()  # keys typed but cancelled, which must not be stored
+        self.stored_at = {}   # key -> when the store first had it
+        self.added = Counter()  # key -> times the store took it in as a new quote
+        self.approved_at = {}  # key -> when it was first approved
+        self.pending = None   # Quotes waiting for the moderator, as of the observer's last look
+        self.errors = []
+
+    def record(self, kind, key, when):
+        with self.lock:
+            self.attempts[kind] += 1
+            if kind == "abandon":
+                self.abandoned.add(key)
+            elif kind == "duplicate":
+                self.repeated.add(key)
+            else:
+                self.submitted[key] = when
+
+    def pick_repeat(self, rng):
+        with self.lock:
+            return rng.choice(list(self.submitted)) if self.submitted else None
+
+    def seen(self, key, status, when, added=False):
+        with self.lock:
+            if added:
+                self.added[key] += 1
+            self.stored_at.setdefault(key, when)
+            if status == "approved":
+                self.approved_at.setdefault(key, when)
+
+    def error(self, who, message):
+        with self.lock:
+            self.errors.append(f"{who}: {message}")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in SUBMISSION_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown submission kind {kind!r}, use {', '.join(SUBMISSION_KINDS)}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def spawn(script, workdir):
+    return pexpect.spawn(sys.executable, [os.path.join(HERE, script)], cwd=workdir, encoding='utf-8',
+                         dimensions=(30, 90), env=dict(os.environ, TERM="xterm"))
+
+
+def drain(child):
+    """Read whatever the child drew, so it never blocks on a full terminal"""
+    try:
+        while child.read_nonblocking(64 * 1024, timeout=0):
+            pass
+    except (pexpect.TIMEOUT, pexpect.EOF):
+        pass
+
+
+def type_at_rate(child, text, rng, chars_per_second):
+    for char in text:
+        child.send(char)
+        time.sleep(rng.uniform(0.5, 1.5) / chars_per_second)
+        drain(child)
+
+
+def make_submission(kind, kiosk, seq, rng, ledger):
+    """Return (kind, name, typed quote, quote as stored)"""
+    if kind == "duplicate":
+        key = ledger.pick_repeat(rng)
+        if key is not None:
+            return kind, key[0], key[1], key[1]
+        kind = "unique"  # Nothing to repeat yet
+    name = f"Kiosk{kiosk} {seq}"
+    words = " ".join(rng.choice(LOAD_WORDS) for _ in range(6))
+    if kind == "long":
+        typed = f"{kiosk}.{seq} {words} and then some more"[:40]
+        return kind, name, typed, typed[:30]  # The kiosk stops taking keys at 30
+    quote = f"{words}"[:30 - len(f" {kiosk}.{seq}")] + f" {kiosk}.{seq}"
+    return kind, name, quote, quote
+
+
+def run_kiosk(kiosk, args, ledger, ready, go):
+    rng = random.Random(args.seed * 1000 + kiosk)
+    who = f"kiosk {kiosk}"
+    child = spawn("main.py", args.workdir)
+    try:
+        child.expect("Press any key", timeout=STARTUP_TIMEOUT)
+        ready.release()
+        go.wait()
+        kinds, weights = zip(*args.mix.items())
+        for seq in range(args.submissions):
+            kind, name, typed, stored = make_submission(rng.choices(kinds, weights)[0], kiosk, seq, rng, ledger)
+            child.send("a")
+            child.expect("your name", timeout=PROMPT_TIMEOUT)
+            time.sleep(INPUT_PAUSE)
+            type_at_rate(child, name, rng, args.cps)
+            if kind == "abandon":
+                child.send("\x1b")
+                ledger.record(kind, (name, stored), time.time())
+                time.sleep(ESC_WAIT)
+                drain(child)
+                continue
+            child.send("\r")
+            child.expect("Say something", timeout=PROMPT_TIMEOUT)
+            type_at_rate(child, typed, rng, args.cps)
+            child.send("\r")
+            ledger.record(kind, (name, stored), time.time())
+            time.sleep(INPUT_PAUSE)
+            drain(child)
+        child.send(")")  # The wall's exit key
+        child.expect(pexpect.EOF, timeout=PROMPT_TIMEOUT)
+    except (pexpect.TIMEOUT, pexpect.EOF) as e:
+        ledger.error(who, f"stuck: {type(e).__name__}")
+        ready.release()
+    finally:
+        if child.isalive():
+            child.terminate(force=True)
+
+
+def run_moderator(args, ledger, kiosks_done, queue_empty):
+    """admin.py approving the selected quote, or a whole screenful, at a steady rate"""
+    child = spawn("admin.py", args.workdir)
+    try:
+        child.expect("ADMIN PANEL", timeout=STARTUP_TIMEOUT)
+        deadline = None
+        while True:
+            if kiosks_done.is_set():
+                deadline = deadline or time.time() + DRAIN_TIMEOUT
+                if queue_empty() or time.time() > deadline:
+                    break
+            if args.moderator_batch:
+                child.send("a")
+            child.send("1")
+            time.sleep(1 / args.approve_rate)
+            drain(child)
+        child.send(")")
+        child.expect(pexpect.EOF, timeout=PROMPT_TIMEOUT)
+    except (pexpect.TIMEOUT, pexpect.EOF) as e:
+        ledger.error("moderator", f"stuck: {type(e).__name__}")
+    finally:
+        if child.isalive():
+            child.terminate(force=True)
+
+
+def observe(ledger, watching, stop):
+    """Note when each quote first shows up in the store, from its change log"""
+    from quote_store import open_store, STATUSES
+    store = open_store()  # SQLite connections belong to the thread that opened them
+    try:
+        cursor = store.change_cursor()
+        watching.set()
+        while not stop.is_set():
+            store.refresh()
+            diff, cursor = store.changes_since(cursor)
+            now = time.time()
+            if diff is None:
+                # The change log was trimmed, so look at everything, quotes not seen before were added
+                changes = [(quote, status, (quote["name"], quote["quote"]) not in ledger.stored_at)
+                           for status in STATUSES for quote in store.quotes(status)]
+            else:
+                changes = [(quote, status, True) for quote, status in diff.added]
+                changes += [(quote, new, False) for quote, _, new in diff.moved]
+            for quote, status, added in changes:
+                ledger.seen((quote["name"], quote["quote"]), status, now, added)
+            ledger.pending = store.count("pending")
+            time.sleep(0.02)
+    finally:
+        store.close()
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "p50_s": round(statistics.median(values), 3),
+        "p95_s": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max_s": round(values[-1], 3),
+    }
+
+
+def reconcile(ledger):
+    """Compare what the kiosks submitted with what the store ended up holding
+
+    A quote is duplicated if the store holds it twice, or if its change log
+    showed it being added more than once.
+    """
+    from quote_store import open_store, STATUSES
+    counts = Counter()
+    status_of = {}
+    store = open_store()
+    try:
+        for status in STATUSES:
+            for quote in store.quotes(status):
+                key = (quote["name"], quote["quote"])
+                counts[key] += 1
+                status_of[key] = status
+    finally:
+        store.close()
+    return {
+        "lost": sorted(key for key in ledger.submitted if counts[key] == 0),
+        "duplicated": sorted({key for key, count in counts.items() if count > 1}
+                             | {key for key, count in ledger.added.items() if count > 1}),
+        "abandoned_but_stored": sorted(key for key in ledger.abandoned - set(ledger.submitted) if counts[key]),
+        "still_pending": sum(1 for key in ledger.submitted if status_of.get(key) == "pending"),
+    }
+
+
+def run_load(args):
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    for path in ("quotes.json", "pending_quotes.json", "removed_quotes.json"):
+        if not os.path.exists(path):
+            with open(path, 'w') as f:
+                json.dump([], f)
+    sys.path.insert(0, HERE)
+
+    ledger = Ledger()
+    ready = threading.Semaphore(0)
+    go = threading.Event()
+    kiosks = [threading.Thread(target=run_kiosk, args=(number, args, ledger, ready, go))
+              for number in range(1, args.kiosks + 1)]
+    for kiosk in kiosks:
+        kiosk.start()
+    for _ in kiosks:
+        ready.acquire()  # Every wall is up before the clock starts
+    print(f"{args.kiosks} kiosks ready in {args.workdir}", file=sys.stderr)
+
+    watching = threading.Event()
+    stop_observing = threading.Event()
+    observer = threading.Thread(target=observe, args=(ledger, watching, stop_observing), daemon=True)
+    observer.start()
+    watching.wait()
+    kiosks_done = threading.Event()
+    moderator = threading.Thread(target=run_moderator, args=(
+        args, ledger, kiosks_done, lambda: ledger.pending == 0))
+    moderator.start()
+
+    start = time.time()
+    go.set()
+    for kiosk in kiosks:
+        kiosk.join()
+    submit_time = time.time() - start
+    kiosks_done.set()
+    moderator.join()
+    time.sleep(0.2)  # Let the observer see the last writes
+    stop_observing.set()
+    observer.join()
+
+    stored = [ledger.stored_at[key] - when for key, when in ledger.submitted.items() if key in ledger.stored_at]
+    approved = [ledger.approved_at[key] - when for key, when in ledger.submitted.items() if key in ledger.approved_at]
+    report = {
+        "kiosks": args.kiosks,
+        "backend": os.environ.get("RETRO_WALL_STORE", "sqlite"),
+        "chars_per_second": args.cps,
+        "mix": args.mix,
+        "attempts": dict(ledger.attempts),
+        "submit_seconds": round(submit_time, 2),
+        "stored_per_second": round(len(stored) / submit_time, 3) if submit_time else None,
+        "approved_per_second": round(len(approved) / (time.time() - start), 3),
+        "submit_to_stored": percentiles(stored),
+        "submit_to_approved": percentiles(approved),
+        "reconciliation": reconcile(ledger),
+        "errors": ledger.errors,
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    result = report["reconciliation"]
+    return 1 if result["lost"] or result["duplicated"] or result["abandoned_but_stored"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the scripted demo, or with --kiosks a load test of several kiosks and a moderator")
+    parser.add_argument("--kiosks", type=int, help="number of main.py kiosks to drive at once")
+    parser.add_argument("--submissions", type=int, default=5, help="quotes each kiosk submits")
+    parser.add_argument("--cps", type=float, default=10.0, help="typing speed in characters per second")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"weights of the submission kinds (default {DEFAULT_MIX})")
+    parser.add_argument("--approve-rate", type=float, default=2.0, help="moderator key presses per second")
+    parser.add_argument("--moderator-batch", action="store_true",
+                        help="approve a whole screen of pending quotes per key press")
+    parser.add_argument("--workdir", help="where the quote files go (default: a new temporary directory)")
+    parser.add_argument("--report", help="also write the report as JSON to this file")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.kiosks is None:
+        run_demo()
+        return
+    args.workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="retro-wall-load-"))
+    sys.exit(run_load(args))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import ctypes
+import ctypes.util
+import os
+import struct
+import threading
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+POLL_INTERVAL = 0.5  # Fallback stat() polling when inotify isn't available
+
+# SQLite publishes a commit in shared memory (no inotify event) right after its
+# last WAL write, so changes are reported once writes went quiet for this long
+SETTLE_TIME = 0.05
+MAX_SETTLE_TIME = 0.5  # But never held back longer than this during a write storm
+
+
+def load_inotify():
+    """Return libc with the inotify functions, or None on systems without them"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """Watches the quote files and reports writes to them
+
+    Every change bumps `generation` and calls on_change, so the UI loops only
+    reload when a file was actually written. With inotify the watcher runs on
+    the event loop through loop.add_reader (attach()); without it a background
+    thread polls stat() instead.
+    """
+
+    def __init__(self, file_names, directory="."):
+        self.directory = directory
+        self.file_names = set(file_names)
+        self.generation = 0
+        self.on_change = None
+        self.loop = None
+        self.settle = None
+        self.first_unreported = None
+        self.fd = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+        libc = load_inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+            if fd >= 0:
+                # Watch the directory, files are replaced by rename and may not exist yet
+                if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) >= 0:
+                    self.fd = fd
+                else:
+                    os.close(fd)
+
+    def attach(self, loop, on_change):
+        """Report changes by calling on_change on the event loop's thread"""
+        self.loop = loop
+        if self.fd is not None:
+            self.on_change = on_change
+            loop.add_reader(self.fd, self.on_readable)
+        else:
+            self.on_change = lambda: loop.call_soon_threadsafe(on_change)
+            self.start()
+
+    def detach(self):
+        """Stop reporting, before the event loop closes"""
+        if self.thread is not None:
+            # Joined here so the thread never calls into a closed loop
+            self.stopped.set()
+            self.thread.join()
+            self.stopped.clear()
+            self.thread = None
+        if self.loop is not None and self.fd is not None:
+            self.loop.remove_reader(self.fd)
+        if self.settle is not None:
+            self.settle.cancel()
+            self.settle = None
+        self.loop = None
+
+    def start(self):
+        """Poll from a background thread, for when inotify isn't available"""
+        self.last_fingerprints = self.fingerprints()  # Before start() returns
+        self.thread = threading.Thread(target=self.watch_polling, daemon=True)
+        self.thread.start()
+
+    def notify(self):
+        self.generation += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def read_changes(self):
+        """Drain pending inotify events, return True if one was for a watched file"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        changed = False
+        offset = 0
+        while offset < len(data):
+            _, _, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0").decode(errors="replace")
+            offset += name_len
+            if name in self.file_names:
+                changed = True
+        return changed
+
+    def on_readable(self):
+        if not self.read_changes():
+            return
+        now = self.loop.time()
+        if self.settle is not None:
+            self.settle.cancel()
+        else:
+            self.first_unreported = now
+        if now - self.first_unreported >= MAX_SETTLE_TIME:
+            self.settled()
+        else:
+            self.settle = self.loop.call_later(SETTLE_TIME, self.settled)
+
+    def settled(self):
+        self.settle = None
+        self.notify()
+
+    def fingerprints(self):
+        result = {}
+        for name in self.file_names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+                result[name] = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                result[name] = None
+        return result
+
+    def watch_polling(self):
+        while not self.stopped.wait(POLL_INTERVAL):
+            current = self.fingerprints()
+            if current != self.last_fingerprints:
+                self.last_fingerprints = current
+                self.notify()
+
+    def stop(self):
+        self.detach()
+        if self.fd is not None:
+            os.close(self.fd)
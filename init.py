@@ -1,8 +1,23 @@
+#!/usr/bin/env python3
+import time
+
+# Taken before anything slow is imported, so the report covers the whole start
+LAUNCH_TIME = time.time()
+
+import asyncio
 import curses
-import subprocess
-import os
+import sys
+
+import metrics
+from terminal import CursesScreen
+from boot import boot_sequence, boot_profile, mark_running
 
-def main(stdscr):
+# One line per launch: how long it took from starting Python to the first quote
+LAUNCH_LOG = "launch_times.log"
+LAUNCH_REPORT = None
+
+
+def splash(stdscr):
     # Clear screen
     stdscr.clear()
     stdscr.refresh()
@@ -10,9 +25,51 @@ def main(stdscr):
     # Wait for user input (any key)
     stdscr.getch()
 
-    # Run boot.py in the same directory
-    boot_path = os.path.join(os.path.dirname(__file__), "boot.py")
-    subprocess.run(["python3", boot_path])
 
-# Start the curses application
-curses.wrapper(main)
+def launch(stdscr, show_splash=True):
+    """Splash, boot sequence and quote wall as stages of one curses session"""
+    profile = boot_profile()
+    # A quick restart goes straight back to the wall without waiting for a key
+    show_splash = show_splash and profile != "fast"
+    waited = 0.0
+    if show_splash:
+        splash_start = time.time()
+        splash(stdscr)
+        waited = time.time() - splash_start
+
+    # The boot sequence's "Loading system modules" step is what imports it
+    boot_sequence(stdscr, profile)
+    import main as wall
+
+    def report_first_quote():
+        global LAUNCH_REPORT
+        elapsed = time.time() - LAUNCH_TIME
+        line = f"Launch to first quote: {elapsed:.2f} s ({profile} boot)"
+        if show_splash:
+            line += f", {waited:.2f} s of it waiting at the splash"
+        LAUNCH_REPORT = line
+        try:
+            with open(LAUNCH_LOG, 'a') as f:
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {line}\n")
+        except OSError:
+            pass
+
+    asyncio.run(wall.main(stdscr, report_first_quote))
+
+
+def run(show_splash=True):
+    metrics.start_export("wall")
+    try:
+        curses.wrapper(lambda window: launch(CursesScreen(window), show_splash))
+    finally:
+        wall = sys.modules.get("main")  # Not there if the boot never got that far
+        if wall is not None:
+            wall.cleanup()  # Make sure buzzer is turned off when the program exits
+        metrics.stop_export()
+        mark_running()
+    if LAUNCH_REPORT:
+        print(LAUNCH_REPORT, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    run()
@@ -3,15 +3,22 @@ import curses
 import json
 import os
 import time
-import pyfiglet
-import random
 import platform
 import subprocess
 import signal
-
-QUOTES_FILE = "quotes.json"
-PENDING_QUOTES_FILE = "pending_quotes.json"
-REMOVED_QUOTES_FILE = "removed_quotes.json"
+import metrics
+from quote_journal import QUOTES_FILE, PENDING_QUOTES_FILE, REMOVED_QUOTES_FILE
+from quote_store import open_store, StoreUnavailable, NAME_CHAR_LIMIT, QUOTE_CHAR_LIMIT
+from renderer import WallScreen, RedrawTracker, flush
+from animation import Scheduler, Typewriter, Blink
+from banner import render_banner
+from quote_deck import QuoteDeck
+from quote_search import QuoteIndex
+from pending_list import PendingList
+from runtime import Runtime, run
+from tone_sequencer import ToneSequencer, Note
+from profiling import ProfileToggle
+from boot import mark_running, MARK_RUNNING_INTERVAL
 
 # Flag to control application exit
 EXIT_APP = False
@@ -20,6 +27,14 @@ ERROR_BEEP_COOLDOWN = False
 ERROR_BEEP_COUNT = 0
 ERROR_BEEP_RESET_TIME = 0
 
+# Shared quote store (SQLite by default, see quote_store.py)
+QUOTE_STORE = None
+# Background watcher that reports writes to the store's files
+QUOTE_WATCHER = None
+# Search index over every quote, built on the first search in the admin panel
+QUOTE_INDEX = None
+# Event loop glue shared by main, add_quote and admin_panel
+RUNTIME = None
 
 # Detect if we're running on a Raspberry Pi or another system
 IS_RASPBERRY_PI = platform.system() == "Linux" and os.path.exists("/sys/firmware/devicetree/base/model") and "raspberry pi" in open("/sys/firmware/devicetree/base/model").read().lower()
@@ -35,6 +50,36 @@ if IS_RASPBERRY_PI:
 else:
     HAS_BUZZER = False
 
+# Buzzer tunes as (frequency, duty, seconds) steps, duty 0 is a rest
+BEEP = [Note(250, 0.2, 0.2)]
+SUCCESS_JINGLE = [
+    step
+    for frequency in (261, 329, 392, 523)  # C4, E4, G4, C5
+    for step in (Note(frequency, 0.3, 0.15), Note(frequency, 0, 0.03))
+]
+ERROR_BEEP = [Note(800, 0.6, 0.1), Note(800, 0, 0.05)]  # Short high-pitched alert
+
+# Tunes play on their own thread, the UI only queues them
+SOUNDS = ToneSequencer(buzzer if HAS_BUZZER else None)
+
+# cProfile for the live kiosk, toggled with CTRL+R or SIGUSR1
+PROFILER = ProfileToggle()
+
+# Opt-in timings, exported when RETRO_WALL_METRICS is set (see metrics.py)
+WALL_FRAME_TIME = metrics.histogram("retro_wall_frame_seconds", "Time to draw and send one frame", screen="wall")
+ADMIN_FRAME_TIME = metrics.histogram("retro_wall_frame_seconds", "Time to draw and send one frame", screen="admin")
+KEY_ECHO_LATENCY = metrics.histogram("retro_wall_key_echo_seconds",
+                                     "From a key arriving to add_quote showing it on screen")
+UPDATE_CHECK_TIME = metrics.histogram("retro_wall_store_load_seconds", "Time spent reading the quote store",
+                                      op="check_for_quote_updates")
+REFRESH_TIME = metrics.histogram("retro_wall_store_load_seconds", "Time spent reading the quote store",
+                                 op="refresh")
+OPEN_TIME = metrics.histogram("retro_wall_store_load_seconds", "Time spent reading the quote store", op="open")
+SUBMIT_TIME = metrics.histogram("retro_wall_store_save_seconds", "Time spent writing the quote store",
+                                op="submit")
+MODERATE_TIME = metrics.histogram("retro_wall_store_save_seconds", "Time spent writing the quote store",
+                                  op="moderate")
+
 def signal_handler(sig, frame):
     # Ignore Ctrl+C (SIGINT) - do nothing when it's pressed
     pass
@@ -42,106 +87,104 @@ def signal_handler(sig, frame):
 # Set up the signal handler for SIGINT (Ctrl+C)
 signal.signal(signal.SIGINT, signal_handler)
 
-def load_quotes(file_path):
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
-    return []
-
-def check_for_quote_updates(current_quotes):
-    """Check if the quotes file has been modified and reload if needed"""
-    new_quotes = load_quotes(QUOTES_FILE)
-    
-    # Also check for pending quotes that might have been approved by admin.py
-    pending_quotes = load_quotes(PENDING_QUOTES_FILE)
-    removed_quotes = load_quotes(REMOVED_QUOTES_FILE)
-    
-    # Filter out any pending quotes that are already in approved or removed lists
-    # This helps synchronize the state between the two running instances
-    filtered_pending = []
-    for quote in pending_quotes:
-        # Skip quotes that are already in approved or removed lists
-        already_processed = False
-        for existing in new_quotes + removed_quotes:
-            if quote["name"] == existing["name"] and quote["quote"] == existing["quote"]:
-                already_processed = True
-                break
-                
-        if not already_processed:
-            filtered_pending.append(quote)
-    
-    # Save the filtered pending quotes back to file
-    if len(filtered_pending) != len(pending_quotes):
-        save_quotes(filtered_pending, PENDING_QUOTES_FILE)
-    
-    if len(new_quotes) != len(current_quotes):
-        return new_quotes, True
-    return current_quotes, False
-
-
-def save_quotes(quotes, file_path):
-    with open(file_path, 'w') as f:
-        json.dump(quotes, f, indent=2)
+def toggle_profiler(quiet=False):
+    """Hidden: a beep when profiling starts, a jingle once the profile is saved, the error beep if it can't be"""
+    saved = PROFILER.toggle()
+    if PROFILER.running:
+        if not quiet:
+            play_beep()
+    elif saved is not None:
+        if not quiet:
+            play_success_jingle()
+    else:
+        play_error_beep()
+
+def check_for_quote_updates(deck, cursor):
+    """Apply approved quotes changed since cursor to the deck, return (new_cursor, was_updated)"""
+    with UPDATE_CHECK_TIME.time():
+        return apply_quote_updates(deck, cursor)
+
+def apply_quote_updates(deck, cursor):
+    diff, cursor = QUOTE_STORE.changes_since(cursor)
+    if diff is None:
+        # Too much happened since the last look, start over from the full list
+        deck.sync(QUOTE_STORE.quotes("approved"))
+        return cursor, True
+
+    taken_down = diff.left("approved")
+    approved = diff.entered("approved")
+    for quote in taken_down:
+        deck.remove(quote)
+    for quote in approved:
+        deck.add(quote)
+    return cursor, bool(taken_down or approved)
+
+def bell_success_jingle():
+    """Success sound for systems without the GPIO buzzer"""
+    if platform.system() == "Darwin":  # MacOS
+        # Use afplay (built-in on MacOS) or print character bell
+        subprocess.run(["osascript", "-e", "beep"])
+    elif platform.system() == "Windows":
+        # Windows - use winsound if available
+        try:
+            import winsound
+            for freq in [261, 329, 392, 523]:  # C4, E4, G4, C5
+                winsound.Beep(freq, 150)  # Each note for 150ms
+                time.sleep(0.03)
+        except ImportError:
+            # Fallback to ASCII bell
+            print("\a", end="", flush=True)
+    else:
+        # Linux/Unix without GPIO - use ASCII bell
+        print("\a", end="", flush=True)
+
+def bell_beep():
+    """Beep for systems without the GPIO buzzer"""
+    if platform.system() == "Darwin":  # MacOS
+        # Use afplay (built-in on MacOS) or print character bell
+        subprocess.run(["osascript", "-e", "beep"])
+    elif platform.system() == "Windows":
+        # Windows - use winsound if available
+        try:
+            import winsound
+            winsound.Beep(250, 200)  # 250Hz for 200ms
+        except ImportError:
+            # Fallback to ASCII bell
+            print("\a", end="", flush=True)
+    else:
+        # Linux/Unix without GPIO - use ASCII bell
+        print("\a", end="", flush=True)
+
+def bell_error_beep():
+    """Error sound for systems without the GPIO buzzer"""
+    if platform.system() == "Darwin":  # MacOS
+        subprocess.run(["osascript", "-e", "beep 2"])  # Use system beep
+    elif platform.system() == "Windows":
+        # Windows - use winsound if available
+        try:
+            import winsound
+            # Play two tones in sequence for the error sound
+            winsound.Beep(800, 100)  # High pitch, short
+            winsound.Beep(180, 300)  # Low pitch, longer
+        except ImportError:
+            # Fallback to ASCII bell
+            print("\a", end="", flush=True)
+            time.sleep(0.2)
+            print("\a", end="", flush=True)
+    else:
+        # Linux/Unix without GPIO - use ASCII bell twice
+        print("\a", end="", flush=True)
+        time.sleep(0.2)
+        print("\a", end="", flush=True)
 
 def play_success_jingle():
     """Play a C major jingle when a quote is successfully added"""
-    if HAS_BUZZER:
-        # C Major mini jingle: C → E → G → C5
-        notes = [261, 329, 392, 523]  # C4, E4, G4, C5
-        
-        for note in notes:
-            # Play each note
-            buzzer.frequency = note
-            buzzer.value = 0.3
-            time.sleep(0.15)
-            buzzer.value = 0
-            time.sleep(0.03)
-    else:
-        # Use system beep on other platforms
-        if platform.system() == "Darwin":  # MacOS
-            # Use afplay (built-in on MacOS) or print character bell
-            subprocess.run(["osascript", "-e", "beep"])
-        elif platform.system() == "Windows":
-            # Windows - use winsound if available
-            try:
-                import winsound
-                for freq in [261, 329, 392, 523]:  # C4, E4, G4, C5
-                    winsound.Beep(freq, 150)  # Each note for 150ms
-                    time.sleep(0.03)
-            except ImportError:
-                # Fallback to ASCII bell
-                print("\a", end="", flush=True)
-        else:
-            # Linux/Unix without GPIO - use ASCII bell
-            print("\a", end="", flush=True)
+    # Cuts off anything still playing, this is the sound that matters most
+    SOUNDS.play(SUCCESS_JINGLE, preempt=True, fallback=bell_success_jingle)
 
 def play_beep():
     """Play a beep sound using either GPIO buzzer or system beep"""
-    if HAS_BUZZER:
-        # Use the GPIO buzzer on Raspberry Pi
-        buzzer.frequency = 250  # Set frequency to 250Hz
-        buzzer.value = 0.2      # Set duty cycle to 20%
-        time.sleep(0.2)         # Play for 0.2 seconds
-        buzzer.value = 0        # Stop the sound
-    else:
-        # Use system beep on other platforms
-        if platform.system() == "Darwin":  # MacOS
-            # Use afplay (built-in on MacOS) or print character bell
-            subprocess.run(["osascript", "-e", "beep"])
-        elif platform.system() == "Windows":
-            # Windows - use winsound if available
-            try:
-                import winsound
-                winsound.Beep(250, 200)  # 250Hz for 200ms
-            except ImportError:
-                # Fallback to ASCII bell
-                print("\a", end="", flush=True)
-        else:
-            # Linux/Unix without GPIO - use ASCII bell
-            print("\a", end="", flush=True)
+    SOUNDS.play(BEEP, preempt=True, fallback=bell_beep)
 
 def play_error_beep():
     """Play an error beep sound when user reaches character limit"""
@@ -165,57 +208,20 @@ def play_error_beep():
     # Increment counter
     ERROR_BEEP_COUNT += 1
     
-    # Original beep code
-    if HAS_BUZZER:
-        # Error sound pattern: high tone → low tone 
-        # First a short high-pitched beep
-        buzzer.frequency = 800  # Higher frequency for alert sound
-        buzzer.value = 0.6      # Louder
-        time.sleep(0.1)         # Very short duration
-        buzzer.value = 0        # Short pause
-        time.sleep(0.05)
-        
-    else:
-        # Use system beep on other platforms
-        if platform.system() == "Darwin":  # MacOS
-            subprocess.run(["osascript", "-e", "beep 2"])  # Use system beep
-        elif platform.system() == "Windows":
-            # Windows - use winsound if available
-            try:
-                import winsound
-                # Play two tones in sequence for the error sound
-                winsound.Beep(800, 100)  # High pitch, short
-                winsound.Beep(180, 300)  # Low pitch, longer
-            except ImportError:
-                # Fallback to ASCII bell
-                print("\a", end="", flush=True)
-                time.sleep(0.2)
-                print("\a", end="", flush=True)
-        else:
-            # Linux/Unix without GPIO - use ASCII bell twice
-            print("\a", end="", flush=True)
-            time.sleep(0.2)
-            print("\a", end="", flush=True)
+    # Queued behind whatever is playing, repeats while it waits are merged
+    SOUNDS.play(ERROR_BEEP, fallback=bell_error_beep)
 
-def add_quote(stdscr, pending_quotes, approved_quotes, removed_quotes):
+async def add_quote(stdscr):
     # Setup to capture ESC key properly
     stdscr.keypad(True)
 
     # Play beep first
     play_beep()
 
-    # First reload all quotes to ensure we have the latest state
-    latest_approved_quotes = load_quotes(QUOTES_FILE)
-    latest_removed_quotes = load_quotes(REMOVED_QUOTES_FILE)
-
     # Prepare screen for input
     stdscr.clear()
     height, width = stdscr.getmaxyx()
 
-    # Set character limits
-    NAME_CHAR_LIMIT = 22
-    QUOTE_CHAR_LIMIT = 30
-
     # Center the prompt for the name input
     prompt_name = "What's your name?"
     name_x_center = (width // 2) - (len(prompt_name) // 2)
@@ -226,41 +232,29 @@ def add_quote(stdscr, pending_quotes, approved_quotes, removed_quotes):
     stdscr.refresh()
 
     # Show blinking cursor during delay
-    curses.curs_set(1)
-
-    # Set non-blocking mode to flush any keystrokes during the delay
-    stdscr.nodelay(True)
+    stdscr.curs_set(1)
 
     # Wait 1 second while flushing any keyboard input
-    start_time = time.time()
-    while time.time() - start_time < 1.0:
-        # Continuously flush the input buffer during the delay
-        while stdscr.getch() != curses.ERR:
-            pass
-        time.sleep(0.01)  # Small sleep to prevent CPU hogging
-
-    # Now setup for name input with 30-second timeout
-    curses.curs_set(1)  # Show cursor
-    stdscr.nodelay(False)  # Turn off non-blocking mode
-    stdscr.timeout(10000)  # 30-second timeout (10000 milliseconds)
+    await RUNTIME.discard_input(1.0)
+
+    # Now setup for name input with 10-second timeout
+    stdscr.curs_set(1)  # Show cursor
 
     # Prepare for name input
     name = ""
-    curses.noecho()  # Don't automatically echo input
+    stdscr.noecho()  # Don't automatically echo input
 
     name_x_pos = name_x_center
 
     # Check for ESC and handle character-by-character input with limit check
     while True:
-        ch = stdscr.getch()
+        ch = await RUNTIME.getch(10.0)
 
         if ch == curses.ERR:  # Timeout occurred
-            curses.curs_set(0)  # Hide cursor again
-            stdscr.timeout(100)  # Return to non-blocking mode
+            stdscr.curs_set(0)  # Hide cursor again
             return None
         elif ch == 27:  # ESC key
-            curses.curs_set(0)  # Hide cursor again
-            stdscr.timeout(100)  # Return to non-blocking mode
+            stdscr.curs_set(0)  # Hide cursor again
             return None
         elif ch == 10:  # Enter key
             break
@@ -280,11 +274,11 @@ def add_quote(stdscr, pending_quotes, approved_quotes, removed_quotes):
                 play_error_beep()
 
         stdscr.refresh()
+        KEY_ECHO_LATENCY.observe(RUNTIME.since_key())
 
     # If no actual content was entered, return to main screen
     if not name:
-        curses.curs_set(0)  # Hide cursor again
-        stdscr.timeout(100)  # Return to non-blocking mode
+        stdscr.curs_set(0)  # Hide cursor again
         return None
 
     # Play beep after name is entered
@@ -303,25 +297,20 @@ def add_quote(stdscr, pending_quotes, approved_quotes, removed_quotes):
     stdscr.refresh()
 
     # Show blinking cursor
-    curses.curs_set(1)
-
-    # Set up 30-second timeout for quote input too
-    stdscr.timeout(15000)  # 30-second timeout (15000 milliseconds)
+    stdscr.curs_set(1)
 
     # Enable input mode for quote
     quote_text = ""
 
     # Handle character-by-character input with limit check for quote
     while True:
-        ch = stdscr.getch()
+        ch = await RUNTIME.getch(15.0)  # 15-second timeout for the quote
 
         if ch == curses.ERR:  # Timeout occurred
-            curses.curs_set(0)  # Hide cursor again
-            stdscr.timeout(100)  # Return to non-blocking mode
+            stdscr.curs_set(0)  # Hide cursor again
             return None
         elif ch == 27:  # ESC key
-            curses.curs_set(0)  # Hide cursor again
-            stdscr.timeout(100)  # Return to non-blocking mode
+            stdscr.curs_set(0)  # Hide cursor again
             return None
         elif ch == 10:  # Enter key
             break
@@ -341,10 +330,10 @@ def add_quote(stdscr, pending_quotes, approved_quotes, removed_quotes):
                 play_error_beep()
 
         stdscr.refresh()
+        KEY_ECHO_LATENCY.observe(RUNTIME.since_key())
 
     # Reset terminal modes
-    curses.curs_set(0)  # Hide cursor again
-    stdscr.timeout(100)  # Return to non-blocking mode
+    stdscr.curs_set(0)  # Hide cursor again
 
     # If no actual content was entered, return to main screen
     if not quote_text:
@@ -354,191 +343,135 @@ def add_quote(stdscr, pending_quotes, approved_quotes, removed_quotes):
     if name and quote_text:
         new_quote = {"name": name, "quote": quote_text}
 
-        # Check if the quote already exists in approved or removed quotes
-        # Using the latest loaded versions from files
-        quote_exists = False
-        for quote in pending_quotes + latest_approved_quotes + latest_removed_quotes:
-            if quote["name"] == name and quote["quote"] == quote_text:
-                quote_exists = True
-                break
-
-        if not quote_exists:
-            pending_quotes.append(new_quote)
-            save_quotes(pending_quotes, PENDING_QUOTES_FILE)
+        # The store refuses quotes that already exist in any state
+        try:
+            with SUBMIT_TIME.time():
+                submitted = QUOTE_STORE.submit(new_quote)
+        except StoreUnavailable:
+            # e.g. the state daemon is restarting, say so instead of dropping the quote silently
+            play_error_beep()
+            message = "Could not save your quote, please try again"
+            stdscr.clear()
+            stdscr.addstr(height // 2 - 2, (width // 2) - (len(message) // 2), message, curses.A_BOLD)
+            stdscr.refresh()
+            await RUNTIME.discard_input(3.0)
+            return None
+        if submitted:
             play_success_jingle()  # Play success jingle after quote is added
-            
-            # Make sure we're in non-blocking mode before returning
-            stdscr.nodelay(True)
-            stdscr.timeout(100)
             return new_quote  # Return the newly added quote
 
-    # Make sure we're in non-blocking mode before returning (in any case)
-    stdscr.nodelay(True)
-    stdscr.timeout(100)
     return None
 
 
-def admin_panel(stdscr, pending_quotes, approved_quotes, removed_quotes):
-    global EXIT_APP
-    curses.curs_set(0)  # Hide cursor
-    stdscr.timeout(100)  # Non-blocking mode initially
+def draw_admin_frame(stdscr, pending_list):
+    stdscr.erase()
+    height, width = stdscr.getmaxyx()
 
-    current_index = 0
-    last_activity_time = time.time()
-    timeout_duration = 10  # seconds
+    # Draw title
+    title = "ADMIN PANEL - PENDING QUOTES"
+    stdscr.addstr(1, (width // 2) - (len(title) // 2), title, curses.A_BOLD | stdscr.color_pair(4))
 
-    while True:
-        # Reload quotes every time the admin panel is entered
-        pending_quotes = load_quotes(PENDING_QUOTES_FILE)
-        approved_quotes = load_quotes(QUOTES_FILE)
-        removed_quotes = load_quotes(REMOVED_QUOTES_FILE)
+    # Show quotes counts
+    pending_count = f"Pending: {QUOTE_STORE.count('pending')}"
+    approved_count = f"Approved: {QUOTE_STORE.count('approved')}"
+    removed_count = f"Removed: {QUOTE_STORE.count('removed')}"
 
-        # Make sure current_index is still valid after reloading
-        if pending_quotes and current_index >= len(pending_quotes):
-            current_index = max(0, len(pending_quotes) - 1)
+    # Display counts on row 3
+    counts_row = 3
+    padding = 4  # Space between counts
 
-        if EXIT_APP:
-            break
+    # Calculate the total width needed for the three main counts
+    three_counts_width = len(pending_count) + len(approved_count) + len(removed_count) + (padding * 2)
+    start_x = (width // 2) - (three_counts_width // 2)
 
-        stdscr.clear()
-        height, width = stdscr.getmaxyx()
+    # Display each count with appropriate color
+    stdscr.addstr(counts_row, start_x, pending_count, stdscr.color_pair(1))
+    start_x += len(pending_count) + padding
 
-        # Draw title
-        title = "ADMIN PANEL - PENDING QUOTES"
-        stdscr.addstr(1, (width // 2) - (len(title) // 2), title, curses.A_BOLD | curses.color_pair(4))
+    stdscr.addstr(counts_row, start_x, approved_count, stdscr.color_pair(3))
+    start_x += len(approved_count) + padding
 
-        # Show quotes counts
-        pending_count = f"Pending: {len(pending_quotes)}"
-        approved_count = f"Approved: {len(approved_quotes)}"
-        removed_count = f"Removed: {len(removed_quotes)}"
+    stdscr.addstr(counts_row, start_x, removed_count, stdscr.color_pair(4))
 
-        # Display counts on row 3
-        counts_row = 3
-        padding = 4  # Space between counts
+    # No pending quotes
+    if not pending_list.total() and pending_list.results is None:
+        no_quotes_msg = "No pending quotes available"
+        stdscr.addstr(height // 2, (width // 2) - (len(no_quotes_msg) // 2), no_quotes_msg, stdscr.color_pair(1))
+    else:
+        # Only the rows that fit on screen are fetched and drawn
+        pending_list.draw(stdscr, stdscr.color_pair(1), stdscr.color_pair(1) | curses.A_REVERSE)
 
-        # Calculate the total width needed for the three main counts
-        three_counts_width = len(pending_count) + len(approved_count) + len(removed_count) + (padding * 2)
-        start_x = (width // 2) - (three_counts_width // 2)
+    # Add instructions at the bottom
+    instructions = "ENTER: Approve | DEL: Remove | ESC: Exit"
+    stdscr.addstr(height - 2, (width // 2) - (len(instructions) // 2), instructions, stdscr.color_pair(1))
 
-        # Display each count with appropriate color
-        stdscr.addstr(counts_row, start_x, pending_count, curses.color_pair(1))
-        start_x += len(pending_count) + padding
+    flush(stdscr)
 
-        stdscr.addstr(counts_row, start_x, approved_count, curses.color_pair(3))
-        start_x += len(approved_count) + padding
 
-        stdscr.addstr(counts_row, start_x, removed_count, curses.color_pair(4))
+async def admin_panel(stdscr):
+    global EXIT_APP
+    stdscr.curs_set(0)  # Hide cursor
 
-        # No pending quotes
-        if not pending_quotes:
-            no_quotes_msg = "No pending quotes available"
-            stdscr.addstr(height // 2, (width // 2) - (len(no_quotes_msg) // 2), no_quotes_msg, curses.color_pair(1))
-        else:
-            # Display current quote
-            if current_index < len(pending_quotes):
-                quote = pending_quotes[current_index]
-
-                # Draw quote in a box
-                box_width = min(width - 10, max(len(quote["quote"]), len(quote["name"])) + 10)
-                box_start_x = (width // 2) - (box_width // 2)
-                box_start_y = height // 2 - 4
-
-                # Draw border
-                for i in range(box_width):
-                    stdscr.addch(box_start_y, box_start_x + i, curses.ACS_HLINE, curses.color_pair(3))
-                    stdscr.addch(box_start_y + 6, box_start_x + i, curses.ACS_HLINE, curses.color_pair(3))
-
-                for i in range(7):
-                    stdscr.addch(box_start_y + i, box_start_x, curses.ACS_VLINE, curses.color_pair(3))
-                    stdscr.addch(box_start_y + i, box_start_x + box_width - 1, curses.ACS_VLINE, curses.color_pair(3))
-
-                # Corners
-                stdscr.addch(box_start_y, box_start_x, curses.ACS_ULCORNER, curses.color_pair(3))
-                stdscr.addch(box_start_y, box_start_x + box_width - 1, curses.ACS_URCORNER, curses.color_pair(3))
-                stdscr.addch(box_start_y + 6, box_start_x, curses.ACS_LLCORNER, curses.color_pair(3))
-                stdscr.addch(box_start_y + 6, box_start_x + box_width - 1, curses.ACS_LRCORNER, curses.color_pair(3))
-
-                # Quote content
-                quote_str = quote["quote"]
-                if len(quote_str) > box_width - 6:
-                    quote_str = quote_str[:box_width - 9] + "..."
-
-                name_str = f"- {quote['name']} -"
-
-                # Display quote and name
-                stdscr.addstr(box_start_y + 2, (width // 2) - (len(quote_str) // 2), quote_str, curses.color_pair(1))
-                stdscr.addstr(box_start_y + 4, (width // 2) - (len(name_str) // 2), name_str, curses.color_pair(1))
-
-                # Show navigation indicator
-                if len(pending_quotes) > 1:
-                    nav_text = f"Quote {current_index + 1} of {len(pending_quotes)}"
-                    stdscr.addstr(box_start_y + 8, (width // 2) - (len(nav_text) // 2), nav_text, curses.color_pair(1))
-            else:
-                current_index = 0 # Reset index if it's out of bounds after reloading
+    QUOTE_INDEX.on_ready = RUNTIME.wake  # A search waiting for the index redraws when it is built
+    pending_list = PendingList(QUOTE_STORE, search_index=QUOTE_INDEX)
+    seen_generation = None
+    frame = RedrawTracker()
+    last_activity_time = time.time()
+    timeout_duration = 10  # seconds
 
-        # Add instructions at the bottom
-        instructions = "ENTER: Approve | DEL: Remove | ESC: Exit"
-        stdscr.addstr(height - 2, (width // 2) - (len(instructions) // 2), instructions, curses.color_pair(1))
+    while True:
+        # Only ask the store for changes when the watcher saw a write
+        if QUOTE_WATCHER.generation != seen_generation:
+            seen_generation = QUOTE_WATCHER.generation
+            with REFRESH_TIME.time():
+                QUOTE_STORE.refresh()
+        pending_list.poll()
 
-        stdscr.refresh()
+        if EXIT_APP:
+            break
+
+        # Only repaint when something on the panel actually changed
+        counts = tuple(QUOTE_STORE.count(status) for status in ("pending", "approved", "removed"))
+        height = stdscr.getmaxyx()[0]
+        if frame.changed((stdscr.getmaxyx(), counts, pending_list.state(height))):
+            with ADMIN_FRAME_TIME.time():
+                draw_admin_frame(stdscr, pending_list)
 
-        # Process keyboard input with timeout
-        stdscr.timeout(100) # Set a short timeout for getch
-        key = stdscr.getch()
+        # Wait for a key, a file change or the inactivity timeout, whichever comes first
+        idle_left = timeout_duration - (time.time() - last_activity_time)
+        key = await RUNTIME.getch(max(0, idle_left), wake_on_change=True)
 
         if key != curses.ERR:
             last_activity_time = time.time() # Update last activity time
-            if key == 27:  # ESC key
-                stdscr.timeout(100)  # Reset timeout before returning
+            if pending_list.handle_key(stdscr, key):  # Scrolling, marking, search and prompts
+                pass
+            elif key == 27:  # ESC key
                 break
-            elif key == curses.KEY_UP and pending_quotes:
-                current_index = (current_index - 1) % len(pending_quotes)
-            elif key == curses.KEY_DOWN and pending_quotes:
-                current_index = (current_index + 1) % len(pending_quotes)
-            elif key == 10 and pending_quotes:  # ENTER key
-                # Approve quote - move to approved quotes
-                if current_index < len(pending_quotes):
-                    approved_quotes.append(pending_quotes.pop(current_index))
-                    save_quotes(approved_quotes, QUOTES_FILE)
-                    save_quotes(pending_quotes, PENDING_QUOTES_FILE)
-                    if current_index >= len(pending_quotes) and len(pending_quotes) > 0:
-                        current_index = len(pending_quotes) - 1
-                    elif not pending_quotes:
-                        current_index = 0
-            elif (key == curses.KEY_DC or key == 127 or key == 8) and pending_quotes:  # DELETE or BACKSPACE key
-                # Reject quote - move to removed quotes
-                if current_index < len(pending_quotes):
-                    removed_quotes.append(pending_quotes.pop(current_index))
-                    save_quotes(removed_quotes, REMOVED_QUOTES_FILE)
-                    save_quotes(pending_quotes, PENDING_QUOTES_FILE)
-                    if current_index >= len(pending_quotes) and len(pending_quotes) > 0:
-                        current_index = len(pending_quotes) - 1
-                    elif not pending_quotes:
-                        current_index = 0
+            elif key == 10:  # ENTER key
+                # Approve the marked quotes (or the selected one) in one write
+                with MODERATE_TIME.time():
+                    pending_list.moderate(stdscr, "approved")
+            elif key == curses.KEY_DC or key == 127 or key == 8:  # DELETE or BACKSPACE key
+                # Reject the marked quotes (or the selected one) in one write
+                with MODERATE_TIME.time():
+                    pending_list.moderate(stdscr, "removed")
             elif check_exit_combination(key):  # Check for the exit combination (Shift+0)
                 EXIT_APP = True
-                stdscr.timeout(100)  # Reset timeout before returning
                 break
         else:
             # No key pressed, check for timeout
             if time.time() - last_activity_time >= timeout_duration:
-                stdscr.timeout(100)  # Reset timeout before returning
                 break # Exit the admin panel loop
 
-    # Ensure timeout is reset when exiting the admin panel
-    stdscr.timeout(100)
-
-def typewriter_effect(stdscr, y, text, color_pair, center_x):
-    for i, ch in enumerate(text):
-        stdscr.addstr(y, center_x + i, ch, color_pair | curses.A_BOLD)
-        stdscr.refresh()
-        time.sleep(0.03)
+def typewriter_effect(stdscr, y, text, color_pair, center_x, on_done=None):
+    """Type text out 30 ms per character, advanced by the scheduler instead of sleeping"""
+    return Typewriter(stdscr, y, center_x, text, color_pair | curses.A_BOLD, char_time=0.03, on_done=on_done)
 
 def draw_menu(stdscr, width, height):
     """Draw the menu with manually implemented blinking effect"""
     # Add copyright notice (non-blinking)
     copyright_text = "© Retro Mowz"
-    stdscr.addstr(height - 1, (width // 2) - (len(copyright_text) // 2), copyright_text, curses.color_pair(1))
+    stdscr.addstr(height - 1, (width // 2) - (len(copyright_text) // 2), copyright_text, stdscr.color_pair(1))
     
     # Note: The blinking effect for "Press any key to add a quote" is now handled in the main loop
 
@@ -546,111 +479,84 @@ def check_exit_combination(key):
     """Check if the key is the Shift+0 combination (ASCII 41 is ")") """
     return key == 41  # ASCII code for the ")" character (Shift+0)
 
-def main(stdscr):
-    global EXIT_APP
-    curses.curs_set(0)  # Hide cursor
-    stdscr.timeout(100)  # Non-blocking getch
+def check_profile_combination(key):
+    """Check if the key is CTRL+R, which starts or stops the profiler"""
+    return key == 18  # ASCII 18 (DC2) is what CTRL+R sends
 
-    # Add variables for quote file monitoring
-    last_check_time = time.time()
-    check_interval = 3  # Check for updates every 3 seconds
+async def main(stdscr, on_first_quote=None):
+    global EXIT_APP, QUOTE_STORE, QUOTE_INDEX, QUOTE_WATCHER, RUNTIME
+    stdscr.curs_set(0)  # Hide cursor
 
-    curses.start_color()
-    curses.init_pair(1, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Main text
-    curses.init_pair(2, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # Menu (changed from black on white to yellow on black)
-    curses.init_pair(3, curses.COLOR_GREEN, curses.COLOR_BLACK)  # Border
-    curses.init_pair(4, curses.COLOR_RED, curses.COLOR_BLACK)    # Admin panel title
+    stdscr.start_color()
+    stdscr.init_pair(1, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Main text
+    stdscr.init_pair(2, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # Menu (changed from black on white to yellow on black)
+    stdscr.init_pair(3, curses.COLOR_GREEN, curses.COLOR_BLACK)  # Border
+    stdscr.init_pair(4, curses.COLOR_RED, curses.COLOR_BLACK)    # Admin panel title
 
     # Initialize key detection
     stdscr.keypad(True)  # Enable keypad mode for arrow keys
 
     # Load all quote types
-    quotes = load_quotes(QUOTES_FILE)
-    pending_quotes = load_quotes(PENDING_QUOTES_FILE)
-    removed_quotes = load_quotes(REMOVED_QUOTES_FILE)
+    with OPEN_TIME.time():
+        QUOTE_STORE = open_store()
+    QUOTE_INDEX = QuoteIndex(QUOTE_STORE)
+    # Taken before loading, changes made in between are then applied twice, which is harmless
+    change_cursor = QUOTE_STORE.change_cursor()
+    # Deals every approved quote once per cycle in random order
+    deck = QuoteDeck(QUOTE_STORE.quotes("approved"))
+
+    # Quote files are reloaded when the watcher reports a write, not on a timer
+    QUOTE_WATCHER = QUOTE_STORE.make_watcher()
+    seen_generation = QUOTE_WATCHER.generation
+
+    # Keys and file changes both arrive through the event loop
+    RUNTIME = Runtime(stdscr, QUOTE_WATCHER)
+    # `kill -USR1 <pid>` starts or stops the profiler without touching the kiosk. Through the
+    # event loop, so saving never happens in the middle of whatever the signal interrupted
+    if hasattr(signal, "SIGUSR1"):
+        RUNTIME.loop.add_signal_handler(signal.SIGUSR1, toggle_profiler, True)
     
-    if not quotes:
-        quotes = [{"name": "System", "quote": "Welcome to the Retro Wall!"}]
+    # Shown while there are no approved quotes
+    empty_quote = {"name": "System", "quote": "Welcome to the Retro Wall!"}
 
-    ascii_title = pyfiglet.figlet_format("Retro Wall", font="small")  # Using the "small" font
+    ascii_title = render_banner("Retro Wall", font="small")  # Using the "small" font
     ascii_title_lines = ascii_title.splitlines()
 
-    displayed_indices = []
     current_quote = None
+    marked_running = 0.0  # So a power cut at any time still boots fast
 
     vertical_space_before_title = 2  # Number of empty lines before the title
     
-    # Variables for manual blinking
-    footer = "Press any key to add a quote"
-    footer_blink = True
-    last_blink_time = time.time()
-    blink_interval = 0.8  # Blink every half second
+    # Title, border and copyright are drawn once, only the quote area is repainted
+    screen = WallScreen(stdscr, ascii_title_lines, vertical_space_before_title)
 
-    while not EXIT_APP:
-        # Check for quote file updates
-        current_time = time.time()
-        if current_time - last_check_time >= check_interval:
-            quotes, was_updated = check_for_quote_updates(quotes)
-            if was_updated:
-                current_quote = None  # Reset to show a new quote
-                displayed_indices = []  # Reset displayed indices
-            last_check_time = current_time
-            
-        stdscr.clear()
-        height, width = stdscr.getmaxyx()
+    # Typing and blinking run on the scheduler so keys are read between frames
+    scheduler = Scheduler()
 
-        # Draw ASCII Title (with added space)
-        for i, line in enumerate(ascii_title_lines):
-            title_y = i + vertical_space_before_title
-            if title_y >= height - 4:  # Leave space for border
-                break
-            stdscr.addstr(title_y, (width // 2) - (len(line) // 2), line, curses.color_pair(1) | curses.A_BOLD)
-
-        # Calculate border position based on the new title position
-        border_top_y = len(ascii_title_lines) + vertical_space_before_title + 1  # Adjusted for space
-
-        # Draw the thicker border
-        for x in range(2, width - 2):  # Top and bottom horizontal border
-            stdscr.addch(border_top_y, x, curses.ACS_HLINE, curses.color_pair(3))  # Top border
-            stdscr.addch(height - 4, x, curses.ACS_HLINE, curses.color_pair(3))  # Bottom border
-
-        # Vertical borders (thicker)
-        for y in range(border_top_y, height - 3):  # Left and right vertical borders
-            stdscr.addch(y, 2, curses.ACS_VLINE, curses.color_pair(3))  # Left border
-            stdscr.addch(y, width - 3, curses.ACS_VLINE, curses.color_pair(3))  # Right border
-
-        # Corners (to complete the thick border)
-        stdscr.addch(border_top_y, 2, curses.ACS_ULCORNER, curses.color_pair(3))
-        stdscr.addch(border_top_y, width-3, curses.ACS_URCORNER, curses.color_pair(3))
-        stdscr.addch(height-4, 2, curses.ACS_LLCORNER, curses.color_pair(3))
-        stdscr.addch(height-4, width-3, curses.ACS_LRCORNER, curses.color_pair(3))
-
-        # Draw Menu with manual blinking effect
-        copyright_text = "© Retro Mowz"
-        stdscr.addstr(height - 1, (width // 2) - (len(copyright_text) // 2), copyright_text, curses.color_pair(1))
-        
-        # Draw blinking footer
-        current_time = time.time()
-        if current_time - last_blink_time >= blink_interval:
-            footer_blink = not footer_blink
-            last_blink_time = current_time
-            
-        if footer_blink:
-            stdscr.addstr(height - 3, (width // 2) - (len(footer) // 2), footer, curses.color_pair(2) | curses.A_BOLD)
+    footer = "Press any key to add a quote"
+    footer_attr = stdscr.color_pair(2) | curses.A_BOLD
+    blink_interval = 0.8  # Blink every 0.8 seconds
+    footer_blink = scheduler.add(Blink(
+        lambda visible: screen.draw_footer(footer, visible, footer_attr), blink_interval, blink_interval
+    ))
 
-        if not quotes:
-            current_quote = {"name": "System", "quote": "No quotes available. Add some!"}
+    while not EXIT_APP:
+        if time.time() - marked_running >= MARK_RUNNING_INTERVAL:
+            mark_running()
+            marked_running = time.time()
+
+        if screen.draw_chrome():
+            footer_blink.invalidate()  # The footer was erased with the rest of the screen
+        screen.clear_body()
+        height, width = screen.height, screen.width
+        border_top_y = screen.border_top_y
+
+        if not deck:
+            current_quote = empty_quote
         elif current_quote is None:
-            available_indices = [i for i in range(len(quotes)) if i not in displayed_indices]
-            if not available_indices:
-                displayed_indices = []
-                available_indices = list(range(len(quotes)))
-            if available_indices:
-                chosen_index = random.choice(available_indices)
-                current_quote = quotes[chosen_index]
-                displayed_indices.append(chosen_index)
-                
+            current_quote = deck.draw()
 
+        typing = None
         if current_quote:
             # Centering the content vertically between the ASCII art and the border
             ascii_end_y = border_top_y
@@ -666,96 +572,114 @@ def main(stdscr):
             name_line = f"- {current_quote['name']} -"
             name_x_center = (width // 2) - (len(name_line) // 2)
 
-            # Typing effect for quote
-            typewriter_effect(stdscr, quote_y, current_quote["quote"], curses.color_pair(1), quote_x_center)
+            # Typing effect for quote, after typing the name is drawn normally
+            def draw_name(y=name_y, x=name_x_center, line=name_line):
+                stdscr.addstr(y, x, line, stdscr.color_pair(1) | curses.A_BOLD)
 
-            # After typing, draw name normally
-            stdscr.addstr(name_y, name_x_center, name_line, curses.color_pair(1) | curses.A_BOLD)
+            typing = scheduler.add(typewriter_effect(
+                stdscr, quote_y, current_quote["quote"], stdscr.color_pair(1), quote_x_center, on_done=draw_name
+            ))
 
-        stdscr.refresh()
+        with WALL_FRAME_TIME.time():
+            scheduler.tick()
+            screen.flush()
 
-        # Make sure we're in non-blocking mode before waiting for input
-        stdscr.nodelay(True)
-        stdscr.timeout(100)
+        # Lets the launcher time how long it took to get a quote on the wall
+        if on_first_quote is not None and current_quote:
+            on_first_quote()
+            on_first_quote = None
 
-        # Wait 5 seconds while listening for keys
-        start_time = time.time()
+        # Show the quote for 5 seconds once it's typed out, listening for keys all along
+        start_time = time.time() + (typing.duration if typing else 0)
         newly_added_quote = None
         while time.time() - start_time < 5 and not EXIT_APP:
-            key = stdscr.getch()
-            
-            # Check if it's time to update the blink state
-            current_time = time.time()
-            if current_time - last_blink_time >= blink_interval:
-                footer_blink = not footer_blink
-                last_blink_time = current_time
-                
-                # Redraw just the blinking text (not the entire screen)
-                if footer_blink:
-                    stdscr.addstr(height - 3, (width // 2) - (len(footer) // 2), footer, curses.color_pair(2) | curses.A_BOLD)
-                else:
-                    # Clear the line where the footer was
-                    stdscr.addstr(height - 3, (width // 2) - (len(footer) // 2), " " * len(footer))
-                
-                stdscr.refresh()
+            # Wait for a key or a file change, but never past the next animation frame
+            frame_due = scheduler.timeout(start_time + 5 - time.time())
+            key = await RUNTIME.getch(frame_due, wake_on_change=True)
+
+            frame_start = time.perf_counter()
+            if scheduler.tick():
+                screen.flush()
+                WALL_FRAME_TIME.observe(time.perf_counter() - frame_start)
             
             if check_exit_combination(key):  # Check if it's the exit combination (Shift+0)
                 EXIT_APP = True
                 break
             elif key == 16:  # CTRL+P (ASCII 16 is DLE, which is what CTRL+P sends)
                 # No beep when entering admin panel
-                admin_panel(stdscr, pending_quotes, quotes, removed_quotes)
-                # Ensure we're in non-blocking mode after admin panel
-                stdscr.nodelay(True)
-                stdscr.timeout(100)
+                await admin_panel(stdscr)
+                screen.invalidate()  # The admin panel drew over the chrome
                 current_quote = None  # Reset to show a random quote after admin panel
                 break
+            elif check_profile_combination(key):
+                toggle_profiler()
             elif key == 27:  # ESC key
                 # Do nothing, but exit the loop to return to the main screen
                 break
             elif key != curses.ERR:  # Check if any other key was pressed
-                newly_added_quote = add_quote(stdscr, pending_quotes, quotes, removed_quotes)
-                
-                # Ensure we're in non-blocking mode after adding quote
-                stdscr.nodelay(True)
-                stdscr.timeout(100)
+                newly_added_quote = await add_quote(stdscr)
+                screen.invalidate()  # The input prompts drew over the chrome
                 
                 if newly_added_quote:
                     current_quote = newly_added_quote
-                    displayed_indices = []
                     
                     # Add a 1-second delay where all keyboard input is ignored
-                    ignore_start_time = time.time()
-                    while time.time() - ignore_start_time < 1.0:
-                        # Flush any keyboard input during this period
-                        while stdscr.getch() != curses.ERR:
-                            pass
-                        time.sleep(0.01)  # Small sleep to prevent CPU hogging
+                    await RUNTIME.discard_input(1.0)
                 break
-            time.sleep(0.1)
+
+            # Reload as soon as the watcher reports a write to the quote files
+            if QUOTE_WATCHER.generation != seen_generation:
+                seen_generation = QUOTE_WATCHER.generation
+                shown_from_deck = current_quote is not None and current_quote in deck
+                showing_placeholder = current_quote is empty_quote
+                # Approved quotes join this cycle, what was already shown stays shown
+                change_cursor, was_updated = check_for_quote_updates(deck, change_cursor)
+                if was_updated:
+                    if not deck:
+                        empty_quote = {"name": "System", "quote": "No quotes available. Add some!"}
+                    # Only cut the current quote short if it was taken down or is a placeholder
+                    if showing_placeholder or (shown_from_deck and current_quote not in deck):
+                        current_quote = None
+                        break
+
+        if typing is not None:
+            scheduler.cancel(typing)  # Don't keep typing into the next screen
 
         if newly_added_quote is None and key != 16:  # Only reset if we didn't open the admin panel
             current_quote = None
 
+    RUNTIME.close()
+
 def cleanup():
     """Clean up resources before exiting"""
+    SOUNDS.stop()
+    PROFILER.stop()
+    metrics.stop_export()
     if HAS_BUZZER:
         buzzer.value = 0
-
-# Ensure all required files exist
-if not os.path.exists(QUOTES_FILE):
-    with open(QUOTES_FILE, 'w') as f:
-        json.dump([], f)
-
-if not os.path.exists(PENDING_QUOTES_FILE):
-    with open(PENDING_QUOTES_FILE, 'w') as f:
-        json.dump([], f)
-
-if not os.path.exists(REMOVED_QUOTES_FILE):
-    with open(REMOVED_QUOTES_FILE, 'w') as f:
-        json.dump([], f)
-
-try:
-    curses.wrapper(main)
-finally:
-    cleanup()  # Make sure buzzer is turned off when the program exits
\ No newline at end of file
+    if QUOTE_WATCHER is not None:
+        QUOTE_WATCHER.stop()
+    if QUOTE_STORE is not None:
+        QUOTE_STORE.close()
+
+def ensure_quote_files():
+    """Ensure all required files exist"""
+    if not os.path.exists(QUOTES_FILE):
+        with open(QUOTES_FILE, 'w') as f:
+            json.dump([], f)
+
+    if not os.path.exists(PENDING_QUOTES_FILE):
+        with open(PENDING_QUOTES_FILE, 'w') as f:
+            json.dump([], f)
+
+    if not os.path.exists(REMOVED_QUOTES_FILE):
+        with open(REMOVED_QUOTES_FILE, 'w') as f:
+            json.dump([], f)
+
+if __name__ == "__main__":
+    ensure_quote_files()
+    metrics.start_export("wall")
+    try:
+        run(main)
+    finally:
+        cleanup()  # Make sure buzzer is turned off when the program exits
\ No newline at end of file
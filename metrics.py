@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import contextlib
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Opt-in: RETRO_WALL_METRICS=file writes <app>_metrics.prom next to the quote
+# files every EXPORT_INTERVAL seconds, =http serves the same text on
+# 127.0.0.1, =file,http does both. Unset, every histogram is a no-op.
+METRICS_MODES = {mode for mode in os.environ.get("RETRO_WALL_METRICS", "").split(",") if mode}
+ENABLED = bool(METRICS_MODES)
+EXPORT_INTERVAL = float(os.environ.get("RETRO_WALL_METRICS_INTERVAL", "10"))
+# The wall listens on this port, the admin panel on the next one
+METRICS_PORT = int(os.environ.get("RETRO_WALL_METRICS_PORT", "9642"))
+APP_PORTS = {"wall": 0, "admin": 1}
+
+# Upper bounds in seconds, from a fast frame up to a stalled loop
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Timer:
+    """with histogram.time(): records how long the block took"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum, in Prometheus' layout"""
+
+    def __init__(self, name, description, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()  # The buzzer thread observes too
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.sum += seconds
+
+    def time(self):
+        return Timer(self)
+
+    def lines(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        labels = "".join(f'{key}="{value}",' for key, value in self.labels)
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{{labels}le="{bound}"}} {cumulative}'
+        labels = "{" + labels.rstrip(",") + "}" if labels else ""
+        yield f"{self.name}_sum{labels} {total}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+class NullHistogram:
+    """What histogram() hands out while metrics are off, costs one call per use"""
+
+    def observe(self, seconds):
+        pass
+
+    def time(self):
+        return NULL_TIMER
+
+
+NULL_TIMER = contextlib.nullcontext()
+NULL_HISTOGRAM = NullHistogram()
+
+HISTOGRAMS = {}  # (name, labels) -> Histogram, in creation order
+
+
+def histogram(name, description, **labels):
+    """The histogram for name and labels, created on first use"""
+    if not ENABLED:
+        return NULL_HISTOGRAM
+    key = (name, tuple(sorted(labels.items())))
+    found = HISTOGRAMS.get(key)
+    if found is None:
+        found = HISTOGRAMS[key] = Histogram(name, description, key[1])
+    return found
+
+
+def render():
+    """Every histogram in the Prometheus text format"""
+    lines = []
+    described = set()
+    for histogram in list(HISTOGRAMS.values()):
+        if histogram.name not in described:
+            described.add(histogram.name)
+            lines.append(f"# HELP {histogram.name} {histogram.description}")
+            lines.append(f"# TYPE {histogram.name} histogram")
+        lines.extend(histogram.lines())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        data = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # stderr is the curses screen
+
+
+class Exporter:
+    """Writes the metrics file on a timer and serves /metrics, both from background threads"""
+
+    def __init__(self, app):
+        self.path = f"{app}_metrics.prom"
+        self.stopped = threading.Event()
+        self.thread = None
+        self.server = None
+        if "http" in METRICS_MODES:
+            try:
+                self.server = ThreadingHTTPServer(("127.0.0.1", METRICS_PORT + APP_PORTS.get(app, 0)),
+                                                  MetricsHandler)
+            except OSError as e:
+                print(f"Metrics endpoint not available: {e}", file=sys.stderr)
+            else:
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        if "file" in METRICS_MODES:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def write(self):
+        # Written whole and renamed, so a reader never sees half a file
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(render())
+        os.replace(tmp_path, self.path)
+
+    def run(self):
+        while not self.stopped.wait(EXPORT_INTERVAL):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.write()  # What happened since the last interval
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+EXPORTER = None
+
+
+def start_export(app):
+    """Start exporting for app ("wall" or "admin") if metrics are on"""
+    global EXPORTER
+    if ENABLED and EXPORTER is None:
+        EXPORTER = Exporter(app)
+
+
+def stop_export():
+    global EXPORTER
+    if EXPORTER is not None:
+        EXPORTER.stop()
+        EXPORTER = None
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+import curses
+from functools import lru_cache
+
+from quote_journal import quote_key
+from quote_store import StoreUnavailable
+from renderer import flush
+
+LIST_TOP = 5  # First list row, below the title and counts
+# Rows under the list: gap, quote, name, position, list keys, instructions, footer
+DETAIL_ROWS = 7
+
+LIST_HELP = "SPACE: Mark | a: Mark page | n: Mark by name | g: Go to # | /: Search"
+RESULTS_HELP = "/: New search | PGUP/PGDN: Page | ESC: Back to the list"
+
+# Most matches a search returns, the rarest word of a query rarely has more
+SEARCH_LIMIT = 100
+
+# Batches at least this big draw a progress bar while they are written
+PROGRESS_MIN = 200
+
+PROMPTS = {
+    "jump": "Go to quote #: ",
+    "name": "Mark quotes by name: ",
+    "search": "Search all quotes: ",
+}
+
+# Shown when a write fails, e.g. while the state daemon restarts
+STORE_UNAVAILABLE = "Could not reach the quote store, try again"
+
+MODERATION_VERBS = {
+    "approved": "Approving",
+    "removed": "Removing",
+}
+
+
+@lru_cache(maxsize=512)
+def format_row(number, name, quote, index_width, name_width, width, marked=False):
+    """One list line, cached so scrolling back over rows costs nothing"""
+    mark = "*" if marked else " "
+    text = f"{mark} {number:>{index_width}}  {name[:name_width]:<{name_width}}  {quote}"
+    if len(text) > width:
+        text = text[:width - 3] + "..."
+    return text.ljust(width)
+
+
+def scroll(index, top, total, rows):
+    """Clamp index to the list and move top as little as possible to keep it on screen"""
+    index = max(0, min(index, total - 1))
+    if index < top:
+        top = index
+    elif index >= top + rows:
+        top = index - rows + 1
+    top = max(0, min(top, max(0, total - rows)))
+    return index, top
+
+
+def truncate(text, width):
+    if len(text) > width:
+        return text[:max(0, width - 3)] + "..."
+    return text
+
+
+class PendingList:
+    """Scrolling view over a store's quotes that only fetches and draws the visible rows
+
+    Rows come from store.page(), so a frame costs the same with 10 pending
+    quotes or 100k. The row geometry is worked out once per terminal size
+    and queue length. Typing `g` starts a jump-to-number prompt.
+
+    Quotes can be marked one by one, a screenful at a time or by name, and
+    moderate() then moves all marked quotes in a single store write.
+
+    With a search_index, `/` searches every quote whatever its status as
+    you type. The matches replace the list until ESC, and moderating one
+    moves it from the status it is in, so a removed quote can be approved.
+    """
+
+    def __init__(self, store, status="pending", search_index=None):
+        self.store = store
+        self.status = status
+        self.search_index = search_index
+        self.index = 0  # Selected quote
+        self.top = 0    # First quote on screen
+        self.prompt = None  # "jump", "name" or "search" while the user is typing into a prompt
+        self.prompt_text = ""
+        self.marked = {}  # key -> quote, in the order they were marked
+        self.results = None  # [(quote, status), ...] while showing search results
+        self.result_index = 0
+        self.result_top = 0
+        self.search_count = 0
+        self.indexing = False  # The last search found the index still building
+        self.notice = None  # Shown on the position line until the next key
+        self.layout_key = None
+        self.layout = None
+
+    def total(self):
+        return self.store.count(self.status)
+
+    def page_size(self, height):
+        return max(1, height - LIST_TOP - DETAIL_ROWS)
+
+    def get_layout(self, height, width, total):
+        key = (height, width, len(str(total)))
+        if key != self.layout_key:
+            index_width = len(str(max(total, 1)))
+            row_width = max(10, width - 4)
+            name_width = max(4, min(20, (row_width - index_width) // 4))
+            self.layout = (self.page_size(height), index_width, name_width, row_width)
+            self.layout_key = key
+        return self.layout
+
+    def clamp(self, rows):
+        self.index, self.top = scroll(self.index, self.top, self.total(), rows)
+        if self.results is not None:
+            self.result_index, self.result_top = scroll(
+                self.result_index, self.result_top, len(self.results), rows)
+
+    def visible(self, rows):
+        return self.store.page(self.status, self.top, rows)
+
+    def selected(self):
+        quotes = self.store.page(self.status, self.index, 1)
+        return quotes[0] if quotes else None
+
+    def selected_result(self):
+        if not self.results:
+            return None
+        return self.results[self.result_index]
+
+    def state(self, height):
+        """Everything the list's part of the frame depends on, for RedrawTracker"""
+        rows = self.page_size(height)
+        self.clamp(rows)
+        shown = tuple(quote_key(quote) for quote in self.visible(rows))
+        search = (self.search_count, self.result_index, self.result_top) if self.results is not None else None
+        return (self.index, self.top, self.prompt, self.prompt_text, len(self.marked), shown, search, self.notice)
+
+    def toggle_mark(self, quote):
+        key = quote_key(quote)
+        if self.marked.pop(key, None) is None:
+            self.marked[key] = quote
+
+    def mark_visible(self, rows):
+        """Mark every quote on screen, or unmark them if they all are already"""
+        quotes = self.visible(rows)
+        if all(quote_key(quote) in self.marked for quote in quotes):
+            for quote in quotes:
+                self.marked.pop(quote_key(quote), None)
+        else:
+            for quote in quotes:
+                self.marked[quote_key(quote)] = quote
+
+    def mark_name(self, name):
+        for quote in self.store.quotes_by_name(self.status, name):
+            self.marked[quote_key(quote)] = quote
+
+    def start_search(self, stdscr):
+        # The first search starts reading every quote, off the UI thread
+        self.search_index.start()
+        self.prompt = "search"
+        self.prompt_text = ""
+        self.search()
+
+    def search(self):
+        """Run the search prompt's text against the index, kept current first"""
+        self.indexing = not self.search_index.ready()
+        if self.indexing:
+            self.results = []  # poll() searches once the index is built
+        else:
+            self.search_index.update()
+            self.results = self.search_index.search(self.prompt_text, SEARCH_LIMIT)
+        self.result_index = 0
+        self.result_top = 0
+        self.search_count += 1
+
+    def poll(self):
+        """Run a search that was waiting for the index, once the index is built"""
+        if self.results is not None and self.indexing and self.search_index.ready():
+            self.search()
+
+    def handle_prompt_key(self, key):
+        if key in (10, curses.KEY_ENTER):
+            if self.prompt == "jump" and self.prompt_text:
+                self.index = int(self.prompt_text) - 1
+            elif self.prompt == "name" and self.prompt_text:
+                self.mark_name(self.prompt_text)
+            elif self.prompt == "search" and not self.prompt_text:
+                self.results = None
+            self.prompt = None
+        elif key == 27:  # ESC cancels the prompt, not the panel
+            if self.prompt == "search":
+                self.results = None
+            self.prompt = None
+        elif key in (curses.KEY_BACKSPACE, 127, 8):
+            self.prompt_text = self.prompt_text[:-1]
+            if self.prompt == "search":
+                self.search()
+        elif self.prompt == "jump":
+            if ord('0') <= key <= ord('9') and len(self.prompt_text) < 9:
+                self.prompt_text += chr(key)
+        elif 32 <= key <= 126:
+            self.prompt_text += chr(key)
+            if self.prompt == "search":
+                self.search()
+
+    def handle_result_key(self, key, rows):
+        if key == curses.KEY_UP and self.results:
+            self.result_index = (self.result_index - 1) % len(self.results)
+        elif key == curses.KEY_DOWN and self.results:
+            self.result_index = (self.result_index + 1) % len(self.results)
+        elif key == curses.KEY_PPAGE:
+            self.result_index -= rows
+            self.result_top -= rows
+        elif key == curses.KEY_NPAGE:
+            self.result_index += rows
+            self.result_top += rows
+        elif key == curses.KEY_HOME:
+            self.result_index = 0
+        elif key == curses.KEY_END:
+            self.result_index = len(self.results) - 1
+        elif key == 27:  # ESC goes back to the list, not out of the panel
+            self.results = None
+        else:
+            return False
+        return True
+
+    def handle_key(self, stdscr, key):
+        """Handle navigation, marking, search and prompt keys, return False for keys it doesn't use"""
+        rows = self.page_size(stdscr.getmaxyx()[0])
+        total = self.total()
+        if key != curses.ERR:
+            self.notice = None
+
+        if self.prompt is not None:
+            self.handle_prompt_key(key)
+        elif key == ord('/') and self.search_index is not None:
+            self.start_search(stdscr)
+        elif self.results is not None:
+            if not self.handle_result_key(key, rows):
+                return False
+        elif key == curses.KEY_UP and total:
+            self.index = (self.index - 1) % total
+        elif key == curses.KEY_DOWN and total:
+            self.index = (self.index + 1) % total
+        elif key == curses.KEY_PPAGE:
+            self.index -= rows
+            self.top -= rows
+        elif key == curses.KEY_NPAGE:
+            self.index += rows
+            self.top += rows
+        elif key == curses.KEY_HOME:
+            self.index = 0
+        elif key == curses.KEY_END:
+            self.index = total - 1
+        elif key == ord(' '):
+            quote = self.selected()
+            if quote is not None:
+                self.toggle_mark(quote)
+                self.index = min(self.index + 1, total - 1)  # Step on, like a file manager
+        elif key == ord('a'):
+            self.mark_visible(rows)
+        elif key in (ord('g'), ord('n')):
+            self.prompt = "jump" if key == ord('g') else "name"
+            self.prompt_text = ""
+        else:
+            return False
+        self.clamp(rows)
+        return True
+
+    def moderate(self, stdscr, status):
+        """Move the marked quotes, or the selected one if none are, to status in one write"""
+        if self.results is not None:
+            return self.moderate_result(status)
+
+        quotes = list(self.marked.values())
+        if not quotes:
+            selected = self.selected()
+            quotes = [selected] if selected is not None else []
+        if not quotes:
+            return 0
+
+        progress = None
+        if len(quotes) >= PROGRESS_MIN:
+            def progress(done, total):
+                self.draw_progress(stdscr, MODERATION_VERBS.get(status, "Updating"), done, total)
+        # Quotes another admin already handled since they were marked are skipped
+        try:
+            self.store.set_status_many(quotes, status, progress, from_status=self.status)
+        except StoreUnavailable:
+            self.notice = STORE_UNAVAILABLE  # The marks stay for the retry
+            return 0
+        self.marked.clear()
+        return len(quotes)
+
+    def moderate_result(self, status):
+        """Move the selected search result from whatever status it is in"""
+        result = self.selected_result()
+        if result is None or result[1] == status:
+            return 0
+        quote, from_status = result
+        try:
+            self.store.set_status_many([quote], status, from_status=from_status)
+        except StoreUnavailable:
+            self.notice = STORE_UNAVAILABLE
+            return 0
+        # Search again so the result shows its new status
+        selected = self.result_index
+        self.search()
+        self.result_index = selected
+        return 1
+
+    def position_y(self, height):
+        return LIST_TOP + self.page_size(height) + 3
+
+    def draw_progress(self, stdscr, verb, done, total):
+        bar_width = 20
+        filled = bar_width * done // total
+        self.draw_message(stdscr, f"{verb} {done}/{total} [{'#' * filled}{' ' * (bar_width - filled)}]")
+
+    def draw_message(self, stdscr, text):
+        """Show text on the position line right away, for work that blocks the panel"""
+        height, width = stdscr.getmaxyx()
+        y = self.position_y(height)
+        stdscr.move(y, 0)
+        stdscr.clrtoeol()
+        stdscr.addstr(y, (width // 2) - (len(text) // 2), text, stdscr.color_pair(2))
+        flush(stdscr)
+
+    def draw(self, stdscr, color_pair, selected_attr):
+        """Draw the visible rows, the selected quote in full and the position line"""
+        if self.results is not None:
+            self.draw_results(stdscr, color_pair, selected_attr)
+            return
+
+        height, width = stdscr.getmaxyx()
+        total = self.total()
+        rows, index_width, name_width, row_width = self.get_layout(height, width, total)
+        self.clamp(rows)
+
+        for offset, quote in enumerate(self.visible(rows)):
+            number = self.top + offset + 1
+            marked = quote_key(quote) in self.marked
+            text = format_row(number, quote["name"], quote["quote"], index_width, name_width, row_width, marked)
+            attr = selected_attr if number - 1 == self.index else color_pair
+            stdscr.addstr(LIST_TOP + offset, 2, text, attr)
+
+        if self.prompt is not None:
+            nav_text = f"{PROMPTS[self.prompt]}{self.prompt_text}_"
+        else:
+            nav_text = f"Quote {self.index + 1} of {total}"
+            if self.marked:
+                nav_text += f" | {len(self.marked)} marked"
+        if self.notice is not None:
+            nav_text = self.notice
+        self.draw_details(stdscr, self.selected(), nav_text, LIST_HELP, rows, color_pair)
+
+    def draw_results(self, stdscr, color_pair, selected_attr):
+        """Draw the search matches in place of the list, each with its status"""
+        height, width = stdscr.getmaxyx()
+        total = len(self.results)
+        rows, index_width, name_width, row_width = self.get_layout(height, width, total)
+        self.clamp(rows)
+
+        shown = self.results[self.result_top:self.result_top + rows]
+        for offset, (quote, status) in enumerate(shown):
+            number = self.result_top + offset + 1
+            text = format_row(number, quote["name"], f"[{status}] {quote['quote']}",
+                              index_width, name_width, row_width)
+            attr = selected_attr if number - 1 == self.result_index else color_pair
+            stdscr.addstr(LIST_TOP + offset, 2, text, attr)
+
+        if self.prompt is not None:
+            nav_text = f"{PROMPTS[self.prompt]}{self.prompt_text}_"
+            if self.indexing:
+                nav_text += "  (indexing quotes...)"
+        elif self.indexing:
+            nav_text = "Indexing quotes..."
+        elif not self.results:
+            nav_text = f"No quotes match \"{self.prompt_text}\""
+        else:
+            more = "+" if total >= SEARCH_LIMIT else ""
+            nav_text = f"Match {self.result_index + 1} of {total}{more} for \"{self.prompt_text}\""
+        if self.notice is not None:
+            nav_text = self.notice
+        result = self.selected_result()
+        self.draw_details(stdscr, result[0] if result else None, nav_text, RESULTS_HELP, rows, color_pair)
+
+    def draw_details(self, stdscr, quote, nav_text, help_text, rows, color_pair):
+        """The selected quote in full, the position line and the list keys under the rows"""
+        height, width = stdscr.getmaxyx()
+        detail_y = LIST_TOP + rows + 1
+        if quote is not None:
+            quote_str = truncate(quote["quote"], width - 4)
+            name_str = truncate(f"- {quote['name']} -", width - 4)
+            stdscr.addstr(detail_y, (width // 2) - (len(quote_str) // 2), quote_str, color_pair)
+            stdscr.addstr(detail_y + 1, (width // 2) - (len(name_str) // 2), name_str, color_pair)
+
+        nav_text = truncate(nav_text, width - 4)
+        stdscr.addstr(detail_y + 2, (width // 2) - (len(nav_text) // 2), nav_text, color_pair)
+
+        help_text = truncate(help_text, width - 4)
+        stdscr.addstr(detail_y + 3, (width // 2) - (len(help_text) // 2), help_text, color_pair)
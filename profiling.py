@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import cProfile
+import io
+import pstats
+import time
+
+# Functions listed in the summary written next to each profile
+SUMMARY_TOP = 30
+
+
+class ProfileToggle:
+    """Starts and stops cProfile in the running process
+
+    Each stop writes profile-<time>.pstats for `python -m pstats` or
+    snakeviz, and profile-<time>.txt with the top functions by cumulative
+    time, in the working directory next to the quote files. Only the
+    thread that called toggle() is profiled, for the kiosk that is the UI.
+    """
+
+    def __init__(self):
+        self.profile = None
+        self.started = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def toggle(self):
+        """Start profiling, or stop and save; returns the .pstats path when one was written
+
+        A profile that could not be written, e.g. to a full or read-only
+        card, is dropped: toggle() then returns None with running False.
+        """
+        if self.profile is None:
+            self.started = time.time()
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            return None
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+        return self.save(profile)
+
+    def save(self, profile):
+        base = time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(self.started))
+        summary = io.StringIO()
+        summary.write(f"Profiled {time.time() - self.started:.1f} s from {time.ctime(self.started)}\n")
+        stats = pstats.Stats(profile, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_TOP)
+        try:
+            profile.dump_stats(f"{base}.pstats")
+            with open(f"{base}.txt", 'w') as f:
+                f.write(summary.getvalue())
+        except OSError:
+            return None
+        return f"{base}.pstats"
+
+    def stop(self):
+        """Save a profile still running at exit"""
+        if self.profile is not None:
+            self.toggle()
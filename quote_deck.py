@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import random
+
+from quote_journal import quote_key
+
+
+class QuoteDeck:
+    """Deals quotes in random order without repeats, like a shuffled deck
+
+    Each draw is one step of Fisher-Yates: pick a random card from the part
+    of the deck not dealt yet and swap it to the end, so a draw is O(1) no
+    matter how many quotes there are. Once every quote was shown a new cycle
+    starts. Quotes added mid-cycle join the cards still to be dealt and
+    removed ones are taken out, without reshuffling or forgetting what was
+    already shown.
+    """
+
+    def __init__(self, quotes=(), rng=None):
+        self.rng = rng or random.Random()
+        self.quotes = {}    # key -> quote
+        self.undealt = []   # Keys still to be shown this cycle
+        self.position = {}  # key -> index in undealt
+        self.last = None
+        for quote in quotes:
+            self.add(quote)
+
+    def __len__(self):
+        return len(self.quotes)
+
+    def __contains__(self, quote):
+        return quote_key(quote) in self.quotes
+
+    def add(self, quote):
+        key = quote_key(quote)
+        if key in self.quotes:
+            return
+        self.quotes[key] = quote
+        self.position[key] = len(self.undealt)
+        self.undealt.append(key)
+
+    def remove(self, quote):
+        key = quote_key(quote)
+        if self.quotes.pop(key, None) is None:
+            return
+        index = self.position.pop(key, None)
+        if index is not None:
+            # Fill the hole with the last undealt card
+            moved = self.undealt.pop()
+            if moved != key:
+                self.undealt[index] = moved
+                self.position[moved] = index
+
+    def sync(self, quotes):
+        """Match the deck to a new list of quotes, keeping the current cycle"""
+        new_quotes = {quote_key(quote): quote for quote in quotes}
+        for key in [key for key in self.quotes if key not in new_quotes]:
+            self.remove(self.quotes[key])
+        for key, quote in new_quotes.items():
+            self.add(quote)
+
+    def shuffle(self):
+        """Start a new cycle with every quote undealt"""
+        self.undealt = list(self.quotes)
+        self.position = {key: index for index, key in enumerate(self.undealt)}
+
+    def draw(self):
+        """Return the next quote, or None if the deck is empty"""
+        if not self.quotes:
+            return None
+        if not self.undealt:
+            self.shuffle()
+
+        index = self.rng.randrange(len(self.undealt))
+        if self.undealt[index] == self.last and len(self.undealt) > 1:
+            # Don't show the last quote of one cycle first in the next one
+            index = (index + 1) % len(self.undealt)
+
+        # Swap the chosen card to the end and deal it
+        key = self.undealt[index]
+        moved = self.undealt[-1]
+        self.undealt[index] = moved
+        self.position[moved] = index
+        self.undealt.pop()
+        del self.position[key]
+
+        self.last = key
+        return self.quotes[key]
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No advisory locks on Windows
+
+QUOTES_FILE = "quotes.json"
+PENDING_QUOTES_FILE = "pending_quotes.json"
+REMOVED_QUOTES_FILE = "removed_quotes.json"
+
+# Append-only log of quote state changes, folded into the snapshot files above
+JOURNAL_FILE = "quotes_journal.jsonl"
+# The journal is renamed to this while it is being compacted
+COMPACTING_FILE = JOURNAL_FILE + ".old"
+
+# Snapshot file each journal event moves a quote into
+EVENT_FILES = {
+    "submitted": PENDING_QUOTES_FILE,
+    "approved": QUOTES_FILE,
+    "removed": REMOVED_QUOTES_FILE,
+}
+
+# Writers hold an exclusive flock() on this file, full reloads a shared one
+LOCK_FILE = "quotes.lock"
+
+COMPACT_THRESHOLD = 64 * 1024  # Compact once the journal grows past 64 KB
+
+# How many recent quote moves a JournalReader remembers for changes_since()
+CHANGE_LOG_SIZE = 1000
+
+# Snapshots start with {"version": N, ...} so the version can be read without parsing
+VERSION_PATTERN = re.compile(rb'^\s*\{\s*"version"\s*:\s*(\d+)')
+
+_compact_lock = threading.Lock()
+_compact_thread = None
+
+# Number of times a snapshot or journal chunk was actually parsed, should stay
+# flat while nothing is being written
+PARSE_COUNT = 0
+
+# file_path -> (fingerprint, version, parsed quotes)
+_snapshot_cache = {}
+
+
+class VersionConflict(Exception):
+    """A snapshot changed on disk since the writer read it"""
+
+
+@contextmanager
+def locked(exclusive=True):
+    """Hold the quote files' advisory lock, shared for readers and exclusive for writers"""
+    if fcntl is None:
+        yield
+        return
+    with open(LOCK_FILE, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def file_fingerprint(file_path):
+    """(inode, size, mtime_ns) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def snapshot_version(file_path):
+    """Version stored at the top of a snapshot, 0 for plain lists and missing files"""
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(64)
+    except FileNotFoundError:
+        return 0
+    match = VERSION_PATTERN.match(head)
+    return int(match.group(1)) if match else 0
+
+
+def load_snapshot_versioned(file_path):
+    """Return (version, quotes), only parsing when the file really changed
+
+    An unchanged fingerprint skips the file entirely. A changed fingerprint
+    with the same stored version (e.g. a touch) only costs reading the header.
+    """
+    global PARSE_COUNT
+    fingerprint = file_fingerprint(file_path)
+    cached = _snapshot_cache.get(file_path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1], cached[2]
+
+    version = snapshot_version(file_path)
+    if cached is not None and version and version == cached[1]:
+        _snapshot_cache[file_path] = (fingerprint, version, cached[2])
+        return version, cached[2]
+
+    quotes = []
+    if fingerprint is not None:
+        with open(file_path, 'r') as f:
+            content = f.read().strip()
+        if content:
+            data = json.loads(content)
+            # Plain lists are the format used before snapshots had versions
+            quotes = data["quotes"] if isinstance(data, dict) else data
+        PARSE_COUNT += 1
+    _snapshot_cache[file_path] = (fingerprint, version, quotes)
+    return version, quotes
+
+
+def load_snapshot(file_path):
+    return load_snapshot_versioned(file_path)[1]
+
+
+def write_snapshot(quotes, file_path, expected_version=None):
+    """Atomically replace a snapshot and bump its version
+
+    Must be called with the lock held. With expected_version set this is a
+    compare-and-swap: VersionConflict is raised if someone else wrote the file
+    since that version was read.
+    """
+    current_version = snapshot_version(file_path)
+    if expected_version is not None and current_version != expected_version:
+        raise VersionConflict(f"{file_path} is at version {current_version}, expected {expected_version}")
+
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": current_version + 1, "quotes": quotes}, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())  # The Pi may lose power right after this
+    os.replace(tmp_path, file_path)
+    return current_version + 1
+
+
+def quote_key(quote):
+    return (quote["name"], quote["quote"])
+
+
+class QuoteState:
+    """The three quote lists plus an index of which list holds each (name, quote)
+
+    Lists are kept as insertion-ordered dicts keyed like the index, so moving a
+    quote between lists and checking for duplicates are O(1).
+    """
+
+    def __init__(self):
+        self.lists = {file_path: {} for file_path in EVENT_FILES.values()}
+        self.index = {}
+        self.list_cache = {}
+        self.versions = {}
+
+    def load_snapshots(self):
+        # Approved and removed go first, so a pending copy of an already
+        # processed quote (left over from older versions) is dropped here
+        for file_path in (QUOTES_FILE, REMOVED_QUOTES_FILE, PENDING_QUOTES_FILE):
+            self.versions[file_path], quotes = load_snapshot_versioned(file_path)
+            for quote in quotes:
+                key = quote_key(quote)
+                if key not in self.index:
+                    self.index[key] = file_path
+                    self.lists[file_path][key] = {"name": quote["name"], "quote": quote["quote"]}
+        self.list_cache = {}
+
+    def apply(self, record):
+        """Move the quote in a journal record into the list its event points at"""
+        target = EVENT_FILES.get(record.get("event"))
+        if target is None:
+            return False
+        key = quote_key(record)
+        current = self.index.get(key)
+        # Replaying a record twice (e.g. after an interrupted compaction) is harmless
+        if current == target:
+            return False
+
+        if current is not None:
+            del self.lists[current][key]
+            self.list_cache.pop(current, None)
+        self.index[key] = target
+        self.lists[target][key] = {"name": record["name"], "quote": record["quote"]}
+        self.list_cache.pop(target, None)
+        return True
+
+    def contains(self, quote):
+        return quote_key(quote) in self.index
+
+    def quotes(self, file_path):
+        if file_path not in self.list_cache:
+            self.list_cache[file_path] = list(self.lists[file_path].values())
+        return self.list_cache[file_path]
+
+
+def read_records(file_path, offset=0, missing_ok=True):
+    """Return (records, new_offset) for the complete lines after offset
+
+    A missing file reads as empty, or raises FileNotFoundError without
+    missing_ok, for readers that have to know a compaction renamed it.
+    """
+    global PARSE_COUNT
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        if not missing_ok:
+            raise
+        return [], 0
+    if data:
+        PARSE_COUNT += 1
+
+    # Stop before a trailing partial line that is still being written
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        line = line.strip()
+        if line:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # Skip a corrupt line rather than losing the rest
+    return records, offset + end
+
+
+def load_state():
+    """Load every snapshot and replay the whole journal on top of them"""
+    state = QuoteState()
+    with locked(exclusive=False):
+        state.load_snapshots()
+        for journal in (COMPACTING_FILE, JOURNAL_FILE):
+            records, _ = read_records(journal)
+            for record in records:
+                state.apply(record)
+    return {file_path: state.quotes(file_path) for file_path in EVENT_FILES.values()}
+
+
+def load_quotes(file_path):
+    return load_state()[file_path]
+
+
+def record_event(event, quote):
+    """Append a single state change to the journal instead of rewriting files"""
+    record_events(event, [quote])
+
+
+def record_events(event, quotes):
+    """Append the same state change for several quotes with one locked write"""
+    lines = "".join(
+        json.dumps({"event": event, "name": quote["name"], "quote": quote["quote"]}) + "\n" for quote in quotes
+    )
+    with locked():
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write(lines)
+
+    try:
+        if os.path.getsize(JOURNAL_FILE) >= COMPACT_THRESHOLD:
+            start_compaction()
+    except OSError:
+        pass
+
+
+def compact_journal():
+    """Fold the journal into the snapshot files and start a fresh journal"""
+    with _compact_lock, locked():
+        # Pick up what a previous interrupted compaction left behind
+        if not os.path.exists(COMPACTING_FILE):
+            if not os.path.exists(JOURNAL_FILE):
+                return
+            os.rename(JOURNAL_FILE, COMPACTING_FILE)
+
+        state = QuoteState()
+        state.load_snapshots()
+        records, _ = read_records(COMPACTING_FILE)
+        for record in records:
+            state.apply(record)
+
+        try:
+            for file_path in EVENT_FILES.values():
+                write_snapshot(state.quotes(file_path), file_path, state.versions[file_path])
+        except VersionConflict:
+            # Someone wrote a snapshot without the lock, leave the old journal
+            # in place so the next compaction retries on top of their version
+            return
+        os.remove(COMPACTING_FILE)
+
+
+def start_compaction():
+    """Compact on a background thread so the UI never waits for it"""
+    global _compact_thread
+    if _compact_thread is not None and _compact_thread.is_alive():
+        return
+    _compact_thread = threading.Thread(target=compact_journal, daemon=True)
+    _compact_thread.start()
+
+
+def wait_for_compaction():
+    if _compact_thread is not None:
+        _compact_thread.join()
+
+
+class JournalReader:
+    """Keeps all three quote lists in memory and replays only new journal records
+
+    Every quote that moves is also appended to `changes` as (quote, old_file,
+    new_file), with None for a quote that didn't exist or disappeared, so
+    callers can apply just the difference. Change number n is
+    changes[n - changes_start].
+    """
+
+    def __init__(self):
+        self.state = None
+        self.changes = []
+        self.changes_start = 0
+        self.reload()
+
+    def log_change(self, quote, old_file, new_file):
+        self.changes.append((quote, old_file, new_file))
+        if len(self.changes) > CHANGE_LOG_SIZE:
+            dropped = len(self.changes) - CHANGE_LOG_SIZE // 2
+            del self.changes[:dropped]
+            self.changes_start += dropped
+
+    def change_count(self):
+        return self.changes_start + len(self.changes)
+
+    def log_difference(self, previous, current):
+        """Log every quote whose list differs between two full states"""
+        for key, file_path in current.index.items():
+            old_file = previous.index.get(key)
+            if old_file != file_path:
+                self.log_change(current.lists[file_path][key], old_file, file_path)
+        for key, old_file in previous.index.items():
+            if key not in current.index:
+                self.log_change(previous.lists[old_file][key], old_file, None)
+
+    def reload(self):
+        previous = self.state
+        # The shared lock keeps a compaction from swapping files halfway through
+        with locked(exclusive=False):
+            self.fingerprints = self.current_fingerprints()
+            self.state = QuoteState()
+            self.state.load_snapshots()
+            records, _ = read_records(COMPACTING_FILE)
+            for record in records:
+                self.state.apply(record)
+            records, self.offset = read_records(JOURNAL_FILE)
+            for record in records:
+                self.state.apply(record)
+        if previous is not None:
+            # Usually nothing after a compaction, everything after an outside edit
+            self.log_difference(previous, self.state)
+
+    def current_fingerprints(self):
+        paths = list(EVENT_FILES.values()) + [COMPACTING_FILE, JOURNAL_FILE]
+        return {path: file_fingerprint(path) for path in paths}
+
+    def refresh(self):
+        """Apply journal records written since the last read, return True if anything changed"""
+        fingerprints = self.current_fingerprints()
+        if fingerprints == self.fingerprints:
+            return False  # Nothing was touched, skip reading anything
+
+        journal_before = self.fingerprints[JOURNAL_FILE]
+        journal_now = fingerprints[JOURNAL_FILE]
+        snapshots_changed = any(
+            fingerprints[path] != self.fingerprints[path] for path in fingerprints if path != JOURNAL_FILE
+        )
+        journal_replaced = journal_now is None or journal_before is None or journal_now[0] != journal_before[0]
+        if snapshots_changed or (journal_replaced and journal_before is not None):
+            # Compacted or edited outside the journal, start over from the snapshots
+            previous = self.state
+            self.reload()
+            return self.state.lists != previous.lists
+
+        self.fingerprints = fingerprints
+        try:
+            records, self.offset = read_records(JOURNAL_FILE, self.offset, missing_ok=False)
+        except FileNotFoundError:
+            # Compaction renamed the journal after the fingerprints were taken
+            previous = self.state
+            self.reload()
+            return self.state.lists != previous.lists
+        changed = False
+        for record in records:
+            before = self.state.index.get(quote_key(record))
+            if self.state.apply(record):
+                after = self.state.index[quote_key(record)]
+                self.log_change(self.state.lists[after][quote_key(record)], before, after)
+                changed = True
+        return changed
+
+    def quotes(self, file_path):
+        return self.state.quotes(file_path)
+
+    def contains(self, quote):
+        return self.state.contains(quote)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import re
+import threading
+from bisect import bisect_left, insort
+
+from quote_journal import quote_key
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Indexed in this order, so search results list pending quotes first
+SEARCH_STATUSES = ("pending", "approved", "removed")
+
+# What a background build hands over to the index the UI uses
+INDEX_FIELDS = ("ids", "quotes", "statuses", "words", "postings", "vocabulary", "cursor")
+
+# A query word that is the prefix of more words than this is too common to
+# count up, it only filters the quotes found through the other words
+PREFIX_EXPANSION_LIMIT = 20000
+# A query word matching at most this many words is checked with a set of them
+FILTER_SET_LIMIT = 64
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class QuoteIndex:
+    """Inverted index from words to quotes, across every status
+
+    Each quote gets a small integer id. postings maps a word to the ids of
+    the quotes using it, and vocabulary is the sorted list of all words, so
+    the words starting with a prefix are two bisects away. Moving a quote to
+    another status only updates its status, a deleted quote is tombstoned
+    and skipped when searching.
+
+    Nothing is read until start() builds the index on a thread with its own
+    store connection, or the first update() builds it in place. From then on
+    it follows the store through changes_since(), so keeping it current
+    costs as much as the change, not a rebuild.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.built = False
+        self.builder = None
+        self.built_copy = None
+        self.on_ready = None  # Called from the builder thread once start()'s build is done
+
+    def rebuild(self):
+        self.built = False
+        self.ids = {}        # key -> id
+        self.quotes = []     # id -> quote
+        self.statuses = []   # id -> status, None once deleted
+        self.words = []      # id -> the quote's distinct words
+        self.postings = {}   # word -> [id, ...]
+        self.cursor = self.store.change_cursor()
+        for status in SEARCH_STATUSES:
+            for quote in self.store.iter_quotes(status):
+                self.add(quote, status)
+        # Sorted once, inserting every new word in order would be quadratic
+        self.vocabulary = sorted(self.postings)  # Every word
+        self.built = True
+
+    def start(self):
+        """Build the index on a background thread, update() picks it up once it is done"""
+        if self.built or self.builder is not None:
+            return
+        # Changes from here on are replayed over the copy, which has them all or some already
+        cursor = self.store.change_cursor()
+        self.builder = threading.Thread(target=self.build_copy, args=(cursor,), daemon=True)
+        self.builder.start()
+
+    def build_copy(self, cursor):
+        store = self.store.reopen()
+        try:
+            copy = QuoteIndex(store)
+            copy.rebuild()
+        finally:
+            store.close()
+        copy.cursor = cursor
+        self.built_copy = copy
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def ready(self):
+        """True once update() can run without building the index first"""
+        return self.built or self.built_copy is not None
+
+    def __len__(self):
+        return len(self.ids) if self.built else 0
+
+    def add(self, quote, status):
+        key = quote_key(quote)
+        quote_id = self.ids.get(key)
+        if quote_id is not None:
+            self.statuses[quote_id] = status
+            return
+        quote_id = len(self.quotes)
+        self.ids[key] = quote_id
+        self.quotes.append(quote)
+        self.statuses.append(status)
+        words = tuple(set(tokenize(quote["name"]) + tokenize(quote["quote"])))
+        self.words.append(words)
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                self.postings[word] = [quote_id]
+                if self.built:
+                    insort(self.vocabulary, word)
+            else:
+                posting.append(quote_id)
+
+    def delete(self, quote):
+        quote_id = self.ids.get(quote_key(quote))
+        if quote_id is not None:
+            self.statuses[quote_id] = None
+
+    def update(self):
+        """Catch up with the store's changes since the last update"""
+        if not self.built:
+            if self.builder is None:
+                self.rebuild()
+                return
+            self.builder.join()  # Only waits if the build isn't done yet
+            if self.built_copy is None:  # The build failed, e.g. the store couldn't be opened
+                self.builder = None
+                self.rebuild()
+                return
+            for field in INDEX_FIELDS:
+                setattr(self, field, getattr(self.built_copy, field))
+            self.built = True
+            self.builder = self.built_copy = None
+        diff, self.cursor = self.store.changes_since(self.cursor)
+        if diff is None:
+            self.rebuild()  # The change log was trimmed, start over
+            return
+        for quote, status in diff.added:
+            self.add(quote, status)
+        for quote, _, status in diff.moved:
+            self.add(quote, status)
+        for quote, _ in diff.removed:
+            self.delete(quote)
+
+    def prefix_range(self, prefix):
+        """(start, end) of the words starting with prefix in vocabulary"""
+        # Every token character sorts below \x7f
+        return bisect_left(self.vocabulary, prefix), bisect_left(self.vocabulary, prefix + "\x7f")
+
+    def count_postings(self, start, end):
+        """How many quotes use the words vocabulary[start:end], with repeats"""
+        return sum(map(len, map(self.postings.__getitem__, self.vocabulary[start:end])))
+
+    def search(self, text, limit=100):
+        """Return up to limit (quote, status) pairs containing every word of text
+
+        Each word of the query matches any word it is a prefix of. Quotes
+        are collected from the rarest query word and checked against the
+        others, so common words don't make a search slow. Short prefixes
+        matching thousands of words aren't even counted, they only filter.
+        """
+        terms = tokenize(text)
+        if not terms:
+            return []
+
+        ranges = []
+        for term in set(terms):
+            start, end = self.prefix_range(term)
+            if start == end:
+                return []
+            ranges.append((end - start, term, start, end))
+        ranges.sort()  # Fewest words first, their counts bound the rest
+
+        candidates = []
+        smallest = float("inf")
+        for expansion, term, start, end in ranges:
+            size = float("inf")
+            # Every word has a quote, so more words than that can't be smaller
+            if expansion <= min(PREFIX_EXPANSION_LIMIT, smallest):
+                size = self.count_postings(start, end)
+            smallest = min(smallest, size)
+            candidates.append((size, expansion, term, start, end))
+        candidates.sort()
+        _, _, _, start, end = candidates[0]
+        # Words matching only a few vocabulary words are looked up, the rest prefix-compared
+        filters = []
+        for _, expansion, term, other_start, other_end in candidates[1:]:
+            if expansion <= FILTER_SET_LIMIT:
+                filters.append(frozenset(self.vocabulary[other_start:other_end]).isdisjoint)
+            else:
+                filters.append(lambda words, term=term: not any(w.startswith(term) for w in words))
+
+        results = []
+        seen = set()
+        for position in range(start, end):
+            for quote_id in self.postings[self.vocabulary[position]]:
+                if quote_id in seen or self.statuses[quote_id] is None:
+                    continue
+                seen.add(quote_id)
+                words = self.words[quote_id]
+                if not any(misses(words) for misses in filters):
+                    results.append((self.quotes[quote_id], self.statuses[quote_id]))
+                    if len(results) >= limit:
+                        return results
+        return results
@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+import contextlib
+import os
+import sqlite3
+import time
+from collections import namedtuple, OrderedDict
+
+import quote_journal
+from file_watcher import FileWatcher
+from quote_journal import QUOTES_FILE, PENDING_QUOTES_FILE, REMOVED_QUOTES_FILE, CHANGE_LOG_SIZE, quote_key
+
+DATABASE_FILE = "quotes.db"
+
+# Pick the backend with RETRO_WALL_STORE=sqlite (default), RETRO_WALL_STORE=json
+# or RETRO_WALL_STORE=daemon to go through state_server.py
+STORE_BACKEND = os.environ.get("RETRO_WALL_STORE", "sqlite")
+
+STATUSES = ("pending", "approved", "removed")
+
+# Batch updates report progress after every this many quotes
+BATCH_CHUNK = 500
+
+# List pages the SQLite store keeps, the one on screen and the ones around it
+PAGE_CACHE_SIZE = 8
+
+# Longest name and quote that can be typed in at the kiosk or submitted
+NAME_CHAR_LIMIT = 22
+QUOTE_CHAR_LIMIT = 30
+
+# JSON file and journal event that belong to each status
+STATUS_FILES = {
+    "pending": PENDING_QUOTES_FILE,
+    "approved": QUOTES_FILE,
+    "removed": REMOVED_QUOTES_FILE,
+}
+STATUS_EVENTS = {
+    "pending": "submitted",
+    "approved": "approved",
+    "removed": "removed",
+}
+FILE_STATUSES = {file_path: status for status, file_path in STATUS_FILES.items()}
+
+
+class StoreUnavailable(Exception):
+    """A write could not reach the store, nothing was lost and it can be tried again"""
+
+
+def validate_quote(quote):
+    """Return why a submitted quote can't be accepted, or None if it can
+
+    The same rules add_quote enforces while typing: a name and a quote of
+    printable ASCII, no longer than the limits.
+    """
+    for field, limit in (("name", NAME_CHAR_LIMIT), ("quote", QUOTE_CHAR_LIMIT)):
+        value = quote.get(field)
+        if not isinstance(value, str) or not value:
+            return f"{field} is missing"
+        if len(value) > limit:
+            return f"{field} is longer than {limit} characters"
+        if not all(32 <= ord(ch) <= 126 for ch in value):
+            return f"{field} must be printable ASCII"
+    return None
+
+
+class QuoteDiff(namedtuple("QuoteDiff", "added removed moved")):
+    """What changed between two points in a store's change log
+
+    added is [(quote, status)] for quotes that are new, removed is
+    [(quote, old_status)] for quotes that are gone altogether and moved is
+    [(quote, old_status, new_status)]. A quote that changed several times
+    appears once, going straight from its first to its last state.
+    """
+
+    def entered(self, status):
+        """Quotes that are in `status` now but weren't before"""
+        return [quote for quote, new in self.added if new == status] + [
+            quote for quote, _, new in self.moved if new == status
+        ]
+
+    def left(self, status):
+        """Quotes that were in `status` before but aren't any more"""
+        return [quote for quote, old in self.removed if old == status] + [
+            quote for quote, old, _ in self.moved if old == status
+        ]
+
+
+def fold_changes(changes):
+    """Turn a list of (quote, old_status, new_status) moves into a QuoteDiff"""
+    first = {}  # key -> status before the first change
+    last = {}   # key -> (quote, status after the last change)
+    for quote, old_status, new_status in changes:
+        key = quote_key(quote)
+        if key not in first:
+            first[key] = old_status
+        last[key] = (quote, new_status)
+
+    added, removed, moved = [], [], []
+    for key, old_status in first.items():
+        quote, new_status = last[key]
+        if old_status == new_status:
+            continue  # Moved away and back again
+        if old_status is None:
+            added.append((quote, new_status))
+        elif new_status is None:
+            removed.append((quote, old_status))
+        else:
+            moved.append((quote, old_status, new_status))
+    return QuoteDiff(added, removed, moved)
+
+
+class QuoteStore:
+    """Common interface of the quote storage backends
+
+    Quotes are {"name": ..., "quote": ...} dicts and are unique by (name, quote).
+    Lists returned by quotes() belong to the store and must not be modified.
+    """
+
+    def refresh(self):
+        """Pick up changes made by other processes, return True if anything changed"""
+        raise NotImplementedError
+
+    def quotes(self, status):
+        raise NotImplementedError
+
+    def count(self, status):
+        return len(self.quotes(status))
+
+    def page(self, status, start, count):
+        """The quotes from position start to start + count of a status, for list views"""
+        return self.quotes(status)[start:start + count]
+
+    def iter_quotes(self, status):
+        """Every quote of a status, without keeping them all cached (e.g. to build an index)"""
+        return iter(self.quotes(status))
+
+    def contains(self, quote):
+        """True if the quote exists in any state"""
+        raise NotImplementedError
+
+    def submit(self, quote):
+        """Add a new pending quote, return False if it is already known in any state"""
+        raise NotImplementedError
+
+    def submit_many(self, quotes):
+        """Submit several quotes in one write, return whether each one was accepted"""
+        return [self.submit(quote) for quote in quotes]
+
+    def set_status(self, quote, status):
+        """Move a quote to another state"""
+        raise NotImplementedError
+
+    def set_status_many(self, quotes, status, progress=None, from_status=None):
+        """Move several quotes to another state in one write
+
+        With from_status set, quotes that are no longer in that state (e.g.
+        another admin already handled them) are left alone. progress(done,
+        total) is called along the way so a UI can show how far a big batch got.
+        """
+        if from_status is not None:
+            still_there = {quote_key(quote) for quote in self.quotes(from_status)}
+            quotes = [quote for quote in quotes if quote_key(quote) in still_there]
+        for done, quote in enumerate(quotes, 1):
+            self.set_status(quote, status)
+            if progress is not None:
+                progress(done, len(quotes))
+
+    def quotes_by_name(self, status, name):
+        return [quote for quote in self.quotes(status) if quote["name"] == name]
+
+    def approve(self, quote):
+        self.set_status(quote, "approved")
+
+    def remove(self, quote):
+        self.set_status(quote, "removed")
+
+    def change_cursor(self):
+        """Position in the change log to hand to changes_since() later"""
+        raise NotImplementedError
+
+    def changes_since(self, cursor):
+        """Return (QuoteDiff, new_cursor) for everything written after cursor
+
+        The cost depends on the number of changes, not on the number of
+        quotes. The diff is None when the log no longer reaches back to
+        cursor, then the caller has to reload whatever it keeps.
+        """
+        raise NotImplementedError
+
+    def watched_files(self):
+        """Names of the files whose changes should trigger a refresh()"""
+        raise NotImplementedError
+
+    def make_watcher(self):
+        """A watcher that reports when refresh() has something to pick up"""
+        return FileWatcher(self.watched_files())
+
+    def load_count(self):
+        """How many times quote data was actually re-read, stays flat while idle"""
+        raise NotImplementedError
+
+    def reopen(self):
+        """Another store on the same quotes, for a thread that may not share this one"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonQuoteStore(QuoteStore):
+    """The JSON snapshot files plus the append-only journal"""
+
+    def __init__(self):
+        self.reader = quote_journal.JournalReader()
+
+    def reopen(self):
+        return JsonQuoteStore()
+
+    def refresh(self):
+        return self.reader.refresh()
+
+    def quotes(self, status):
+        return self.reader.quotes(STATUS_FILES[status])
+
+    def contains(self, quote):
+        return self.reader.contains(quote)
+
+    def submit(self, quote):
+        self.reader.refresh()
+        if self.reader.contains(quote):
+            return False
+        quote_journal.record_event("submitted", quote)
+        self.reader.refresh()
+        return True
+
+    def submit_many(self, quotes):
+        # Known quotes and repeats within the batch are dropped, the rest is one append
+        self.reader.refresh()
+        accepted = []
+        new_keys = set()
+        new_quotes = []
+        for quote in quotes:
+            key = quote_key(quote)
+            is_new = key not in new_keys and not self.reader.contains(quote)
+            if is_new:
+                new_keys.add(key)
+                new_quotes.append(quote)
+            accepted.append(is_new)
+        if new_quotes:
+            quote_journal.record_events("submitted", new_quotes)
+            self.reader.refresh()
+        return accepted
+
+    def set_status(self, quote, status):
+        # Like SQLite's UPDATE, a quote that isn't stored stays that way
+        self.reader.refresh()
+        if not self.reader.contains(quote):
+            return
+        quote_journal.record_event(STATUS_EVENTS[status], quote)
+        self.reader.refresh()
+
+    def set_status_many(self, quotes, status, progress=None, from_status=None):
+        # The whole batch is a single append to the journal, of the quotes that are stored
+        self.reader.refresh()
+        index = self.reader.state.index
+        if from_status is not None:
+            from_file = STATUS_FILES[from_status]
+            quotes = [quote for quote in quotes if index.get(quote_key(quote)) == from_file]
+        else:
+            quotes = [quote for quote in quotes if quote_key(quote) in index]
+        if quotes:
+            quote_journal.record_events(STATUS_EVENTS[status], quotes)
+            self.reader.refresh()
+        if progress is not None:
+            progress(len(quotes), len(quotes))
+
+    def change_cursor(self):
+        self.reader.refresh()
+        return self.reader.change_count()
+
+    def changes_since(self, cursor):
+        reader = self.reader
+        reader.refresh()
+        if cursor < reader.changes_start:
+            return None, reader.change_count()
+        changes = [
+            (quote, FILE_STATUSES.get(old_file), FILE_STATUSES.get(new_file))
+            for quote, old_file, new_file in reader.changes[cursor - reader.changes_start:]
+        ]
+        return fold_changes(changes), reader.change_count()
+
+    def watched_files(self):
+        return list(STATUS_FILES.values()) + [quote_journal.JOURNAL_FILE, quote_journal.COMPACTING_FILE]
+
+    def load_count(self):
+        return quote_journal.PARSE_COUNT
+
+    def close(self):
+        quote_journal.wait_for_compaction()  # Don't cut a background compaction short
+
+
+class SqliteQuoteStore(QuoteStore):
+    """All quotes in one SQLite table with a status column
+
+    State changes are single-row updates through the (name, quote) index, so
+    moving a quote between states is atomic. Query results are cached and only
+    reloaded when PRAGMA data_version shows another connection committed.
+
+    Triggers log every insert, status change and delete into the changes
+    table, whichever process made it, and keep only the last CHANGE_LOG_SIZE
+    entries. changes_since() reads that log through its primary key. Other
+    triggers keep the number of quotes per status in status_counts.
+    """
+
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS quotes (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                quote TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS quotes_name_quote ON quotes (name, quote);
+            CREATE INDEX IF NOT EXISTS quotes_status ON quotes (status, id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                quote TEXT NOT NULL,
+                old_status TEXT,
+                new_status TEXT
+            );
+            CREATE TRIGGER IF NOT EXISTS quotes_inserted AFTER INSERT ON quotes BEGIN
+                INSERT INTO changes (name, quote, old_status, new_status)
+                VALUES (new.name, new.quote, NULL, new.status);
+            END;
+            CREATE TRIGGER IF NOT EXISTS quotes_moved AFTER UPDATE OF status ON quotes
+            WHEN old.status != new.status BEGIN
+                INSERT INTO changes (name, quote, old_status, new_status)
+                VALUES (new.name, new.quote, old.status, new.status);
+            END;
+            CREATE TRIGGER IF NOT EXISTS quotes_deleted AFTER DELETE ON quotes BEGIN
+                INSERT INTO changes (name, quote, old_status, new_status)
+                VALUES (old.name, old.quote, old.status, NULL);
+            END;
+            CREATE TRIGGER IF NOT EXISTS changes_trimmed AFTER INSERT ON changes BEGIN
+                DELETE FROM changes WHERE seq <= new.seq - %d;
+            END;
+            CREATE TABLE IF NOT EXISTS status_counts (
+                status TEXT PRIMARY KEY,
+                n INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS quotes_counted AFTER INSERT ON quotes BEGIN
+                INSERT INTO status_counts (status, n) VALUES (new.status, 1)
+                ON CONFLICT (status) DO UPDATE SET n = n + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS quotes_recounted AFTER UPDATE OF status ON quotes
+            WHEN old.status != new.status BEGIN
+                UPDATE status_counts SET n = n - 1 WHERE status = old.status;
+                INSERT INTO status_counts (status, n) VALUES (new.status, 1)
+                ON CONFLICT (status) DO UPDATE SET n = n + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS quotes_uncounted AFTER DELETE ON quotes BEGIN
+                UPDATE status_counts SET n = n - 1 WHERE status = old.status;
+            END;
+        """ % CHANGE_LOG_SIZE)
+        self.migrate_json()
+        self.migrate_counts()
+
+        self.data_version = None
+        self.cache = {}
+        self.pages = OrderedDict()  # (status, start, count) -> (quotes, ids), least recently used first
+        self.counts = {}
+        self.changed = False  # Set by our own writes, which data_version doesn't report
+        self.loads = 0
+        self.refresh()
+
+    def reopen(self):
+        # Connections can't be shared between threads
+        return SqliteQuoteStore(self.path)
+
+    def migrate_json(self):
+        """One-shot import of the JSON files (and any journal) into the database"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+            if done is None:
+                state = quote_journal.load_state()
+                now = time.time()
+                # Approved and removed go first so they win over a stale pending copy
+                for status in ("approved", "removed", "pending"):
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO quotes (name, quote, status, updated) VALUES (?, ?, ?, ?)",
+                        [(q["name"], q["quote"], status, now) for q in state[STATUS_FILES[status]]],
+                    )
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(now),))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def migrate_counts(self):
+        """One-shot count of a database from before status_counts, the triggers keep it from there"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = self.conn.execute("SELECT value FROM meta WHERE key = 'counted'").fetchone()
+            if done is None:
+                self.conn.execute("DELETE FROM status_counts")
+                self.conn.execute(
+                    "INSERT INTO status_counts (status, n) SELECT status, COUNT(*) FROM quotes GROUP BY status"
+                )
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('counted', ?)", (str(time.time()),))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def invalidate(self):
+        self.cache = {}
+        self.pages.clear()
+        self.counts = {}
+
+    def refresh(self):
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version and not self.changed:
+            return False
+        self.data_version = version
+        self.invalidate()
+        self.changed = False
+        return True
+
+    def quotes(self, status):
+        if status not in self.cache:
+            rows = self.conn.execute(
+                "SELECT name, quote FROM quotes WHERE status = ? ORDER BY id", (status,)
+            ).fetchall()
+            self.loads += 1
+            self.cache[status] = [{"name": name, "quote": quote} for name, quote in rows]
+        return self.cache[status]
+
+    def page(self, status, start, count):
+        # Only the rows on screen are read, through the (status, id) index
+        start = max(0, start)
+        count = min(count, self.count(status) - start)  # Past the end there is nothing to read
+        if count <= 0:
+            return []
+        key = (status, start, count)
+        if key in self.pages:
+            self.pages.move_to_end(key)
+            return self.pages[key][0]
+        for (cached_status, cached_start, _), (quotes, ids) in self.pages.items():
+            if cached_status == status and cached_start <= start and start + count <= cached_start + len(ids):
+                return quotes[start - cached_start:start - cached_start + count]  # e.g. the selected row
+
+        rows = self.read_page(status, start, count)
+        self.loads += 1
+        quotes = [{"name": name, "quote": quote} for _, name, quote in rows]
+        if len(rows) == count:  # Short means another process just changed the list, don't build on it
+            self.pages[key] = (quotes, [row[0] for row in rows])
+            if len(self.pages) > PAGE_CACHE_SIZE:
+                self.pages.popitem(last=False)
+        return quotes
+
+    def read_page(self, status, start, count):
+        """(id, name, quote) rows of a page, carrying on from a cached neighbour's ids where there is one
+
+        start and count are within the list, as page() clamps them.
+        """
+        for (cached_status, cached_start, _), (_, ids) in reversed(self.pages.items()):
+            if cached_status != status:
+                continue
+            if cached_start <= start - 1 < cached_start + len(ids):  # Scrolled down
+                return self.conn.execute(
+                    "SELECT id, name, quote FROM quotes WHERE status = ? AND id > ? ORDER BY id LIMIT ?",
+                    (status, ids[start - 1 - cached_start], count),
+                ).fetchall()
+            if cached_start <= start + count < cached_start + len(ids):  # Scrolled up
+                return self.conn.execute(
+                    "SELECT id, name, quote FROM quotes WHERE status = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (status, ids[start + count - cached_start], count),
+                ).fetchall()[::-1]
+        # A jump with nothing cached nearby, only this skips through the index, from the nearer end
+        after = self.count(status) - start
+        if after < start:
+            return self.conn.execute(
+                "SELECT id, name, quote FROM quotes WHERE status = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (status, count, after - count),
+            ).fetchall()[::-1]
+        return self.conn.execute(
+            "SELECT id, name, quote FROM quotes WHERE status = ? ORDER BY id LIMIT ? OFFSET ?",
+            (status, count, start),
+        ).fetchall()
+
+    def count(self, status):
+        if not self.counts:
+            self.counts = dict.fromkeys(STATUSES, 0)
+            # Kept by the triggers, so this reads a few rows instead of scanning the table
+            for row_status, n in self.conn.execute("SELECT status, n FROM status_counts"):
+                self.counts[row_status] = n
+            self.loads += 1
+        return self.counts.get(status, 0)
+
+    def contains(self, quote):
+        row = self.conn.execute(
+            "SELECT 1 FROM quotes WHERE name = ? AND quote = ?", (quote["name"], quote["quote"])
+        ).fetchone()
+        return row is not None
+
+    @contextlib.contextmanager
+    def writing(self):
+        """A write that can't get the database, e.g. locked past the timeout, can be tried again"""
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            raise StoreUnavailable(f"{self.path}: {e}") from e
+
+    def submit(self, quote):
+        with self.writing():
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO quotes (name, quote, status, updated) VALUES (?, ?, 'pending', ?)",
+                (quote["name"], quote["quote"], time.time()),
+            )
+        if cursor.rowcount != 1:
+            return False
+        self.invalidate()
+        self.changed = True
+        return True
+
+    def submit_many(self, quotes):
+        # One transaction, the unique index turns duplicates into ignored inserts
+        accepted = []
+        now = time.time()
+        with self.writing():
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for quote in quotes:
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO quotes (name, quote, status, updated) VALUES (?, ?, 'pending', ?)",
+                        (quote["name"], quote["quote"], now),
+                    )
+                    accepted.append(cursor.rowcount == 1)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                self.invalidate()
+                self.changed = True
+        return accepted
+
+    def set_status(self, quote, status):
+        with self.writing():
+            self.conn.execute(
+                "UPDATE quotes SET status = ?, updated = ? WHERE name = ? AND quote = ?",
+                (status, time.time(), quote["name"], quote["quote"]),
+            )
+        self.invalidate()
+        self.changed = True
+
+    def set_status_many(self, quotes, status, progress=None, from_status=None):
+        # One transaction, so other processes see all of the batch or none of it
+        quotes = list(quotes)
+        now = time.time()
+        sql = "UPDATE quotes SET status = ?, updated = ? WHERE name = ? AND quote = ?"
+        if from_status is not None:
+            sql += " AND status = ?"
+        with self.writing():
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for start in range(0, len(quotes), BATCH_CHUNK):
+                    chunk = quotes[start:start + BATCH_CHUNK]
+                    self.conn.executemany(
+                        sql,
+                        [(status, now, quote["name"], quote["quote"]) + ((from_status,) if from_status else ())
+                         for quote in chunk],
+                    )
+                    if progress is not None:
+                        progress(start + len(chunk), len(quotes))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                self.invalidate()
+                self.changed = True
+
+    def iter_quotes(self, status):
+        cursor = self.conn.execute("SELECT name, quote FROM quotes WHERE status = ? ORDER BY id", (status,))
+        for name, quote in cursor:
+            yield {"name": name, "quote": quote}
+
+    def quotes_by_name(self, status, name):
+        # The (name, quote) index finds them without scanning the table
+        rows = self.conn.execute(
+            "SELECT name, quote FROM quotes WHERE name = ? AND status = ? ORDER BY id", (name, status)
+        ).fetchall()
+        return [{"name": name, "quote": quote} for name, quote in rows]
+
+    def change_cursor(self):
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, cursor):
+        oldest = self.conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        if oldest is not None and oldest > cursor + 1:
+            return None, self.change_cursor()  # Trimmed past the cursor
+        rows = self.conn.execute(
+            "SELECT seq, name, quote, old_status, new_status FROM changes WHERE seq > ? ORDER BY seq", (cursor,)
+        ).fetchall()
+        if not rows:
+            return QuoteDiff([], [], []), cursor
+        changes = [({"name": name, "quote": quote}, old, new) for _, name, quote, old, new in rows]
+        return fold_changes(changes), rows[-1][0]
+
+    def watched_files(self):
+        name = os.path.basename(self.path)
+        return [name, name + "-wal"]
+
+    def load_count(self):
+        return self.loads
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(backend=None):
+    backend = backend or STORE_BACKEND
+    if backend == "json":
+        return JsonQuoteStore()
+    if backend == "daemon":
+        from state_client import RemoteQuoteStore  # state_client imports this module
+        return RemoteQuoteStore()
+    return SqliteQuoteStore()
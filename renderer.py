@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import curses
+
+
+def flush(stdscr):
+    """Send pending drawing to the terminal in one batch"""
+    stdscr.noutrefresh()
+    stdscr.doupdate()
+
+
+class RedrawTracker:
+    """Remembers what the last frame showed so identical frames can be skipped"""
+
+    def __init__(self):
+        self.last = None
+
+    def invalidate(self):
+        self.last = None
+
+    def changed(self, state):
+        if state == self.last:
+            return False
+        self.last = state
+        return True
+
+
+class WallScreen:
+    """Keeps the wall's static chrome on screen and repaints only what changes
+
+    The title, border and copyright are drawn once per terminal size instead of
+    every cycle. A new quote only erases the area inside the border. Nothing
+    calls clear(), which would make curses resend the whole screen.
+    """
+
+    def __init__(self, stdscr, title_lines, space_before_title=2, copyright_text="© Retro Mowz"):
+        self.stdscr = stdscr
+        self.title_lines = title_lines
+        self.space_before_title = space_before_title
+        self.copyright_text = copyright_text
+        self.size = None
+        self.body = None
+        # Row of the border's top edge, just below the title
+        self.border_top_y = len(title_lines) + space_before_title + 1
+
+    @property
+    def height(self):
+        return self.size[0]
+
+    @property
+    def width(self):
+        return self.size[1]
+
+    def invalidate(self):
+        """Force the chrome to be redrawn, e.g. after another screen used the terminal"""
+        self.size = None
+
+    def draw_chrome(self):
+        """Draw title, border and copyright if the terminal size changed, return True if drawn"""
+        size = self.stdscr.getmaxyx()
+        if size == self.size:
+            return False
+        self.size = size
+        height, width = size
+        stdscr = self.stdscr
+        stdscr.erase()
+
+        # Draw ASCII Title (with added space)
+        for i, line in enumerate(self.title_lines):
+            title_y = i + self.space_before_title
+            if title_y >= height - 4:  # Leave space for border
+                break
+            stdscr.addstr(title_y, (width // 2) - (len(line) // 2), line, stdscr.color_pair(1) | curses.A_BOLD)
+
+        border_top_y = self.border_top_y
+
+        # Draw the thicker border
+        stdscr.hline(border_top_y, 2, stdscr.acs("HLINE") | stdscr.color_pair(3), width - 4)
+        stdscr.hline(height - 4, 2, stdscr.acs("HLINE") | stdscr.color_pair(3), width - 4)
+        stdscr.vline(border_top_y, 2, stdscr.acs("VLINE") | stdscr.color_pair(3), height - 3 - border_top_y)
+        stdscr.vline(border_top_y, width - 3, stdscr.acs("VLINE") | stdscr.color_pair(3), height - 3 - border_top_y)
+
+        # Corners (to complete the thick border)
+        stdscr.addch(border_top_y, 2, stdscr.acs("ULCORNER"), stdscr.color_pair(3))
+        stdscr.addch(border_top_y, width - 3, stdscr.acs("URCORNER"), stdscr.color_pair(3))
+        stdscr.addch(height - 4, 2, stdscr.acs("LLCORNER"), stdscr.color_pair(3))
+        stdscr.addch(height - 4, width - 3, stdscr.acs("LRCORNER"), stdscr.color_pair(3))
+
+        copyright_text = self.copyright_text
+        stdscr.addstr(height - 1, (width // 2) - (len(copyright_text) // 2), copyright_text, stdscr.color_pair(1))
+
+        # The area inside the border, the only part a new quote needs to erase
+        body_height = (height - 4) - (border_top_y + 1)
+        body_width = width - 6
+        if body_height > 0 and body_width > 0:
+            self.body = stdscr.derwin(body_height, body_width, border_top_y + 1, 3)
+        else:
+            self.body = None
+        return True
+
+    def clear_body(self):
+        if self.body is not None:
+            self.body.erase()
+            self.body.syncup()  # Mark the erased cells as changed in stdscr
+
+    def draw_footer(self, text, visible, attr):
+        height, width = self.size
+        x = (width // 2) - (len(text) // 2)
+        if visible:
+            self.stdscr.addstr(height - 3, x, text, attr)
+        else:
+            # Clear the line where the footer was
+            self.stdscr.addstr(height - 3, x, " " * len(text))
+
+    def flush(self):
+        flush(self.stdscr)
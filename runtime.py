@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import asyncio
+import curses
+
+import metrics
+from terminal import CursesScreen
+
+WAIT_TIME = metrics.histogram("retro_wall_wait_seconds", "Time the UI spent waiting for a key or a change",
+                              kind="getch")
+DISCARD_TIME = metrics.histogram("retro_wall_wait_seconds", "Time the UI spent waiting for a key or a change",
+                                 kind="discard_input")
+# How far past its deadline a timed wait woke up, large values mean something blocked the loop
+WAKEUP_LATENESS = metrics.histogram("retro_wall_wakeup_lateness_seconds",
+                                    "How late timed waits woke up, from work blocking the event loop")
+
+
+class Runtime:
+    """The asyncio side of a curses UI: keys and file changes
+
+    stdin (the screen's input_fd()) is watched with loop.add_reader, so a coroutine waiting for a key
+    wakes the moment one arrives instead of polling getch() with a timeout.
+    File change notifications from the watcher wake the same waiters.
+    """
+
+    def __init__(self, stdscr, watcher=None):
+        self.stdscr = stdscr
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.change_pending = False
+        self.watcher = watcher
+        self.input_at = None  # When stdin became readable, for the key that getch() returns next
+        self.key_at = None    # When the last key getch() returned arrived
+
+        stdscr.nodelay(True)  # getch() must never block the loop
+        self.stdin_fd = stdscr.input_fd()
+        self.loop.add_reader(self.stdin_fd, self.input_ready)
+        if watcher is not None:
+            watcher.attach(self.loop, self.file_changed)
+
+    def input_ready(self):
+        if self.input_at is None:
+            self.input_at = self.loop.time()
+        self.wakeup.set()
+
+    def since_key(self):
+        """Seconds since the last key getch() returned arrived on stdin"""
+        return self.loop.time() - self.key_at
+
+    def file_changed(self):
+        self.change_pending = True
+        self.wakeup.set()
+
+    def wake(self):
+        """Wake a getch(wake_on_change=True) from another thread, as a file change would"""
+        try:
+            self.loop.call_soon_threadsafe(self.file_changed)
+        except RuntimeError:
+            pass  # The loop already closed, nobody is waiting
+
+    async def getch(self, timeout=None, wake_on_change=False):
+        """Return the next key, or curses.ERR once timeout seconds have passed
+
+        With wake_on_change a file change also ends the wait early (returning
+        curses.ERR), so the caller can reload and redraw right away.
+        """
+        deadline = None if timeout is None else self.loop.time() + timeout
+        while True:
+            key = self.stdscr.getch()
+            if key != curses.ERR:
+                self.key_at = self.input_at if self.input_at is not None else self.loop.time()
+                self.input_at = None
+                return key
+            # Nothing to read, so any arrival time noted was for a key already returned
+            self.input_at = None
+            if wake_on_change and self.change_pending:
+                self.change_pending = False
+                return curses.ERR
+
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    return curses.ERR
+            self.wakeup.clear()
+            try:
+                with WAIT_TIME.time():
+                    await asyncio.wait_for(self.wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                WAKEUP_LATENESS.observe(self.loop.time() - deadline)
+                # The next pass reads a key that raced the timeout, or returns ERR
+
+    async def discard_input(self, duration):
+        """Throw away every key pressed during the next duration seconds"""
+        deadline = self.loop.time() + duration
+        with DISCARD_TIME.time():
+            while self.loop.time() < deadline:
+                await self.getch(deadline - self.loop.time())
+
+    def close(self):
+        self.loop.remove_reader(self.stdin_fd)
+        if self.watcher is not None:
+            self.watcher.detach()
+
+
+def run(main, *args):
+    """curses.wrapper() for a coroutine: main(stdscr, *args) runs on a fresh event loop
+
+    stdscr is the terminal as a CursesScreen, pass a terminal.FrameBuffer
+    to main() instead to run it without one.
+    """
+    return curses.wrapper(lambda window: asyncio.run(main(CursesScreen(window), *args)))
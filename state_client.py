@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+import json
+import os
+import select
+import socket
+from collections import deque
+
+from quote_journal import CHANGE_LOG_SIZE, quote_key
+from quote_store import QuoteStore, StoreUnavailable, STATUSES, fold_changes
+
+# Where state_server.py listens, relative to the quote files like everything else
+STATE_SOCKET = os.environ.get("RETRO_WALL_STATE_SOCKET", "retro_wall.sock")
+
+# How long to wait for the daemon's first snapshot or a reply to a write
+REQUEST_TIMEOUT = 10.0
+# How often a subscriber whose daemon went away tries to reconnect
+RECONNECT_INTERVAL = 1.0
+
+# Messages are JSON lines. Quotes travel as [name, quote] pairs, the daemon
+# sends {"type": "snapshot", "quotes": {status: [...]}} on connect, then
+# {"type": "changes", "changes": [[name, quote, old_status, new_status], ...]}
+# after every write and {"type": "reply", "id": ...} for each request.
+
+
+def pack(quote):
+    return [quote["name"], quote["quote"]]
+
+
+def unpack(pair):
+    return {"name": pair[0], "quote": pair[1]}
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class RemoteQuoteStore(QuoteStore):
+    """A QuoteStore kept in sync by the state daemon instead of reading files
+
+    The daemon sends every quote once on connect and then only the changes,
+    which this copy applies as they arrive, so reads never leave the
+    process. Writes are requests to the daemon, the only process that
+    writes the real store. Its change events come before its reply, so a
+    write is visible here by the time it returns.
+
+    Without a daemon to connect to the store starts out empty, the watcher
+    keeps trying and the snapshot then arrives as a change.
+    """
+
+    def __init__(self, path=STATE_SOCKET):
+        self.path = path
+        self.sock = None
+        self.buffer = b""
+        self.replies = {}
+        self.next_id = 0
+        self.watchers = []
+
+        self.by_status = {status: {} for status in STATUSES}  # status -> key -> quote
+        self.status_of = {}  # key -> status
+        self.lists = {}      # status -> cached list of by_status[status]
+        self.changes = deque(maxlen=CHANGE_LOG_SIZE)  # (quote, old_status, new_status)
+        self.changes_start = 0
+        self.changed = False
+        self.loads = 0
+        try:
+            self.connect()
+        except (ConnectionError, TimeoutError):
+            pass  # Not up yet, refresh() and the watcher connect later
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(f"No state daemon at {self.path} (start state_server.py): {e}") from e
+        self.sock = sock
+        self.buffer = b""
+        self.replies = {}
+        self.snapshot_received = False
+        try:
+            self.wait_for(lambda: self.snapshot_received)
+        except TimeoutError:
+            sock.close()
+            self.sock = None
+            raise
+        for watcher in self.watchers:
+            watcher.connection_made()
+
+    def disconnect(self):
+        for watcher in self.watchers:
+            watcher.connection_lost()
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def fileno(self):
+        return self.sock.fileno() if self.sock is not None else None
+
+    def receive(self):
+        """Apply whatever the daemon sent so far without blocking, return True if quotes changed"""
+        if self.sock is None:
+            return False
+        loads_before = self.loads
+        while True:
+            try:
+                data = self.sock.recv(256 * 1024, socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                data = b""
+            if not data:
+                self.disconnect()
+                break
+            self.buffer += data
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            self.handle(json.loads(line))
+        return self.loads != loads_before
+
+    def wait_for(self, condition):
+        while not condition():
+            if self.sock is None:
+                raise ConnectionError(f"Lost the state daemon at {self.path}")
+            ready, _, _ = select.select([self.sock], [], [], REQUEST_TIMEOUT)
+            if not ready:
+                raise TimeoutError(f"The state daemon at {self.path} did not answer")
+            self.receive()
+
+    def handle(self, message):
+        kind = message.get("type")
+        if kind == "reply":
+            self.replies[message["id"]] = message
+        elif kind == "changes":
+            for name, quote, _, new_status in message["changes"]:
+                self.apply({"name": name, "quote": quote}, new_status)
+            self.loads += 1
+        elif kind == "snapshot":
+            self.load_snapshot(message["quotes"])
+
+    def load_snapshot(self, quotes):
+        self.by_status = {status: {} for status in STATUSES}
+        self.status_of = {}
+        for status in STATUSES:
+            for pair in quotes.get(status, ()):
+                quote = unpack(pair)
+                key = quote_key(quote)
+                self.by_status[status][key] = quote
+                self.status_of[key] = status
+        self.lists = {}
+        # Everything may have changed, so no cursor from before reaches past this
+        self.changes_start += len(self.changes) + 1
+        self.changes.clear()
+        self.snapshot_received = True
+        self.changed = True
+        self.loads += 1
+
+    def apply(self, quote, new_status):
+        # Moves are applied from wherever the quote is here, so repeats are harmless
+        key = quote_key(quote)
+        old_status = self.status_of.get(key)
+        if old_status == new_status:
+            return
+        if old_status is not None:
+            del self.by_status[old_status][key]
+            self.lists.pop(old_status, None)
+        if new_status is not None:
+            self.by_status[new_status][key] = quote
+            self.status_of[key] = new_status
+            self.lists.pop(new_status, None)
+        else:
+            del self.status_of[key]
+        if len(self.changes) == self.changes.maxlen:
+            self.changes_start += 1
+        self.changes.append((quote, old_status, new_status))
+        self.changed = True
+
+    def request(self, op, **args):
+        """Have the daemon carry out a write, StoreUnavailable if it may not have
+
+        A request that could not be sent goes out once more on a fresh
+        connection, the daemon restarted or went away. One that was sent
+        but not answered may have been carried out, so it is not repeated:
+        a repeated submit would come back as a duplicate.
+        """
+        try:
+            request_id = self.send_request(op, args)
+        except OSError:
+            self.disconnect()
+            try:
+                request_id = self.send_request(op, args)
+            except OSError as e:
+                self.disconnect()
+                raise StoreUnavailable(f"State daemon at {self.path}: {e}") from e
+        try:
+            self.wait_for(lambda: request_id in self.replies)
+        except OSError as e:
+            self.disconnect()
+            raise StoreUnavailable(f"State daemon at {self.path} did not answer: {e}") from e
+        reply = self.replies.pop(request_id)
+        if "error" in reply:
+            raise StoreUnavailable(f"State daemon: {reply['error']}")  # e.g. the database was locked
+        return reply.get("result")
+
+    def send_request(self, op, args):
+        if self.sock is None:
+            self.connect()
+        self.next_id += 1
+        self.sock.sendall(encode({"id": self.next_id, "op": op, "args": args}))
+        return self.next_id
+
+    def refresh(self):
+        if self.sock is None:
+            try:
+                self.connect()
+            except (ConnectionError, TimeoutError):
+                return False
+        self.receive()
+        changed, self.changed = self.changed, False
+        return changed
+
+    def quotes(self, status):
+        quotes = self.lists.get(status)
+        if quotes is None:
+            quotes = self.lists[status] = list(self.by_status[status].values())
+        return quotes
+
+    def count(self, status):
+        return len(self.by_status[status])
+
+    def contains(self, quote):
+        return quote_key(quote) in self.status_of
+
+    def submit(self, quote):
+        return self.request("submit_many", quotes=[pack(quote)])[0]
+
+    def submit_many(self, quotes):
+        return self.request("submit_many", quotes=[pack(quote) for quote in quotes])
+
+    def set_status(self, quote, status):
+        self.request("set_status_many", quotes=[pack(quote)], status=status)
+
+    def set_status_many(self, quotes, status, progress=None, from_status=None):
+        quotes = list(quotes)
+        self.request("set_status_many", quotes=[pack(quote) for quote in quotes],
+                     status=status, from_status=from_status)
+        if progress is not None:
+            progress(len(quotes), len(quotes))
+
+    def change_cursor(self):
+        self.receive()
+        return self.changes_start + len(self.changes)
+
+    def changes_since(self, cursor):
+        self.receive()
+        if cursor < self.changes_start:
+            return None, self.change_cursor()
+        changes = list(self.changes)[cursor - self.changes_start:]
+        return fold_changes(changes), self.change_cursor()
+
+    def watched_files(self):
+        return []
+
+    def make_watcher(self):
+        return SubscriptionWatcher(self)
+
+    def load_count(self):
+        return self.loads
+
+    def reopen(self):
+        return RemoteQuoteStore(self.path)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class SubscriptionWatcher:
+    """FileWatcher's interface for a RemoteQuoteStore: change events instead of file writes
+
+    The daemon's socket is watched with loop.add_reader, events are applied
+    as they arrive and on_change fires once per batch. If the daemon goes
+    away the watcher keeps trying to reconnect, the new snapshot then counts
+    as a change.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.generation = 0
+        self.on_change = None
+        self.loop = None
+        self.fd = None
+        self.retry = None
+        store.watchers.append(self)
+
+    def attach(self, loop, on_change):
+        self.loop = loop
+        self.on_change = on_change
+        self.watch()
+
+    def watch(self):
+        self.fd = self.store.fileno()
+        if self.fd is None:
+            self.retry = self.loop.call_later(RECONNECT_INTERVAL, self.reconnect)
+            return
+        self.loop.add_reader(self.fd, self.on_readable)
+        # Events may have been read off the socket before the loop started watching it
+        if self.store.changed:
+            self.notify()
+
+    def connection_made(self):
+        if self.loop is None:
+            return
+        if self.retry is not None:
+            self.retry.cancel()
+            self.retry = None
+        self.watch()
+
+    def on_readable(self):
+        if self.store.receive():
+            self.notify()
+
+    def connection_lost(self):
+        if self.loop is not None and self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.fd = None
+            self.retry = self.loop.call_later(RECONNECT_INTERVAL, self.reconnect)
+
+    def reconnect(self):
+        self.retry = None
+        try:
+            self.store.connect()  # Calls connection_made()
+        except (ConnectionError, TimeoutError):
+            self.retry = self.loop.call_later(RECONNECT_INTERVAL, self.reconnect)
+
+    def notify(self):
+        self.generation += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def detach(self):
+        if self.loop is not None and self.fd is not None:
+            self.loop.remove_reader(self.fd)
+        if self.retry is not None:
+            self.retry.cancel()
+            self.retry = None
+        self.fd = None
+        self.loop = None
+
+    def stop(self):
+        self.detach()
+        if self in self.store.watchers:
+            self.store.watchers.remove(self)
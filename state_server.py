@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+import signal
+import sys
+
+from quote_store import open_store, STATUSES
+from state_client import STATE_SOCKET, encode, pack, unpack
+
+# The store the daemon keeps the quotes in: RETRO_WALL_STATE_STORE=sqlite (default) or json
+STATE_STORE = os.environ.get("RETRO_WALL_STATE_STORE", "sqlite")
+
+# Longest message a client may send, a batch of a few thousand quotes fits easily
+MAX_MESSAGE = 16 * 1024 * 1024
+# A subscriber that stops reading is dropped once this much is waiting for it
+MAX_BACKLOG = 64 * 1024 * 1024
+
+
+class StateServer:
+    """Keeps the quotes in memory, does every write and pushes changes to subscribers
+
+    Displays and admin panels connect over a Unix socket with
+    RETRO_WALL_STORE=daemon. Each gets a snapshot of every quote once and
+    after that only the changes, taken from the store's change log. Writes
+    from other processes that still open the store directly are noticed by
+    a watcher and pushed the same way.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.cursor = store.change_cursor()
+        self.clients = set()
+        self.handlers = set()
+
+    def snapshot(self):
+        return {
+            "type": "snapshot",
+            "quotes": {status: [pack(quote) for quote in self.store.quotes(status)] for status in STATUSES},
+        }
+
+    def send(self, writer, message):
+        if writer.is_closing():
+            return
+        writer.write(message if isinstance(message, bytes) else encode(message))
+        if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+            writer.close()  # It will reconnect and start over from a snapshot
+
+    def publish(self):
+        """Send everything written since the last publish to every subscriber"""
+        self.store.refresh()
+        diff, self.cursor = self.store.changes_since(self.cursor)
+        if diff is None:
+            message = encode(self.snapshot())
+        else:
+            changes = [pack(quote) + [None, status] for quote, status in diff.added]
+            changes += [pack(quote) + [old, new] for quote, old, new in diff.moved]
+            changes += [pack(quote) + [status, None] for quote, status in diff.removed]
+            if not changes:
+                return
+            message = encode({"type": "changes", "changes": changes})
+        # Encoded once, however many displays are listening
+        for writer in list(self.clients):
+            self.send(writer, message)
+
+    def perform(self, op, args):
+        if op == "submit_many":
+            return self.store.submit_many([unpack(pair) for pair in args["quotes"]])
+        if op == "set_status_many":
+            if args["status"] not in STATUSES:
+                raise ValueError(f"unknown status {args['status']!r}")
+            self.store.set_status_many([unpack(pair) for pair in args["quotes"]], args["status"],
+                                       from_status=args.get("from_status"))
+            return None
+        raise ValueError(f"unknown request {op!r}")
+
+    async def handle_client(self, reader, writer):
+        self.publish()  # So the snapshot and the changes that follow line up
+        self.send(writer, self.snapshot())
+        self.clients.add(writer)
+        self.handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Too long or reset
+                if not line:
+                    break
+                reply = {"type": "reply"}
+                try:
+                    request = json.loads(line)
+                    reply["id"] = request["id"]
+                    reply["result"] = self.perform(request["op"], request.get("args", {}))
+                except Exception as e:
+                    reply["error"] = str(e)
+                # Everyone sees the change, the writer included, before the writer gets its reply
+                self.publish()
+                self.send(writer, reply)
+        finally:
+            self.clients.discard(writer)
+            self.handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def serve(self, path):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+
+        watcher = self.store.make_watcher()
+        watcher.attach(loop, self.publish)
+
+        # Take over a socket file left behind by a previous run
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        server = await asyncio.start_unix_server(self.handle_client, path, limit=MAX_MESSAGE)
+        print(f"Serving quote state on {path}", file=sys.stderr)
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            # Closing the connections ends their handlers before asyncio.run() cancels them
+            for writer in list(self.clients):
+                writer.close()
+            await asyncio.gather(*self.handlers, return_exceptions=True)
+            watcher.stop()
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def main():
+    if STATE_STORE == "daemon":
+        sys.exit("RETRO_WALL_STATE_STORE has to name a real store, sqlite or json")
+    store = open_store(STATE_STORE)
+    try:
+        asyncio.run(StateServer(store).serve(STATE_SOCKET))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
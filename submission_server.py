@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+from quote_store import open_store, validate_quote
+
+# Listen on this TCP port for the LAN, or on a Unix socket when RETRO_WALL_SUBMIT_SOCKET is set
+SUBMIT_PORT = int(os.environ.get("RETRO_WALL_SUBMIT_PORT", "8642"))
+SUBMIT_SOCKET = os.environ.get("RETRO_WALL_SUBMIT_SOCKET")
+
+# Submissions waiting for the writer, past that clients are told to retry
+QUEUE_SIZE = 2000
+# The writer takes up to BATCH_SIZE submissions per write, waiting at most
+# BATCH_WINDOW seconds for more to arrive after the first one
+BATCH_SIZE = 200
+BATCH_WINDOW = 0.01
+# How long a request waits for the writer before giving up
+REPLY_TIMEOUT = 10.0
+# Largest request body, a name and a quote fit many times over
+MAX_BODY = 4096
+
+
+class Submission:
+    def __init__(self, quote):
+        self.quote = quote
+        self.accepted = None  # True, False for a duplicate, None if the write failed
+        self.done = threading.Event()
+
+
+class BatchWriter:
+    """The one thread that writes submissions to the store
+
+    Request threads only queue their quote and wait. The writer drains the
+    queue in batches and hands each batch to store.submit_many(), so a burst
+    of submissions is a handful of writes instead of one per quote, and
+    clients never contend with each other for the store.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join(timeout=REPLY_TIMEOUT)
+
+    def submit(self, quote):
+        """Queue a quote, return its Submission or None if the queue is full"""
+        submission = Submission(quote)
+        try:
+            self.queue.put_nowait(submission)
+        except queue.Full:
+            return None
+        return submission
+
+    def next_batch(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + BATCH_WINDOW
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                submission = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if submission is None:
+                self.queue.put(None)  # Finish this batch, stop on the next
+                break
+            batch.append(submission)
+        return batch
+
+    def run(self):
+        # SQLite connections belong to the thread that opened them
+        store = open_store()
+        try:
+            while True:
+                batch = self.next_batch()
+                if batch is None:
+                    break
+                try:
+                    accepted = store.submit_many([submission.quote for submission in batch])
+                except Exception as e:  # e.g. the database stayed locked past its timeout
+                    print(f"Could not save {len(batch)} submissions: {e}", file=sys.stderr)
+                    accepted = [None] * len(batch)
+                for submission, ok in zip(batch, accepted):
+                    submission.accepted = ok
+                    submission.done.set()
+        finally:
+            store.close()
+
+
+def parse_submission(content_type, body):
+    """The {"name", "quote"} of a JSON or form-encoded body, or None if it isn't one"""
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    if content_type == "application/json":
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+    elif content_type == "application/x-www-form-urlencoded":
+        data = {key: values[0] for key, values in parse_qs(text).items()}
+    else:
+        return None
+    return {"name": data.get("name"), "quote": data.get("quote")}
+
+
+class SubmissionHandler(BaseHTTPRequestHandler):
+    """POST /quotes with a name and quote, as JSON or from an HTML form"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so a tablet can send many over one connection
+
+    def do_POST(self):
+        if self.path != "/quotes":
+            self.reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            self.close_connection = True  # The body wasn't read, so the connection is out of step
+            self.reply(413 if length > MAX_BODY else 400, {"error": "bad request body"})
+            return
+
+        quote = parse_submission(self.headers.get_content_type(), self.rfile.read(length))
+        if quote is None:
+            self.reply(400, {"error": "expected a JSON or form body with name and quote"})
+            return
+        problem = validate_quote(quote)
+        if problem is not None:
+            self.reply(400, {"error": problem})
+            return
+
+        submission = self.server.writer.submit(quote)
+        if submission is None:
+            self.reply(503, {"error": "too many submissions, try again"})
+        elif not submission.done.wait(REPLY_TIMEOUT) or submission.accepted is None:
+            self.reply(503, {"error": "could not save the quote, try again"})
+        elif submission.accepted:
+            self.reply(201, {"status": "pending"})
+        else:
+            self.reply(409, {"error": "that quote was already submitted"})
+
+    def reply(self, code, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Hundreds of requests a second would drown out anything useful
+
+
+class SubmissionServer(ThreadingHTTPServer):
+    # The default backlog of 5 resets connections when a room full of tablets connects at once
+    request_queue_size = 128
+
+
+class UnixHTTPServer(SubmissionServer):
+    """The same HTTP service on a Unix socket, for clients on the kiosk itself"""
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        # Take over a socket file left behind by a previous run
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+        # HTTPServer.server_bind() expects a (host, port) address
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def make_server(writer):
+    if SUBMIT_SOCKET:
+        server = UnixHTTPServer(SUBMIT_SOCKET, SubmissionHandler)
+        where = SUBMIT_SOCKET
+    else:
+        server = SubmissionServer(("", SUBMIT_PORT), SubmissionHandler)
+        where = f"port {SUBMIT_PORT}"
+    server.writer = writer
+    return server, where
+
+
+def main():
+    # Let systemd's SIGTERM run the cleanup below
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
+
+    writer = BatchWriter()
+    writer.start()
+    server, where = make_server(writer)
+    print(f"Accepting quotes on {where}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        writer.stop()
+        if SUBMIT_SOCKET:
+            try:
+                os.unlink(SUBMIT_SOCKET)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+import curses
+import os
+import select
+import sys
+
+# The UIs draw on a Screen: the curses window calls they use (addstr, addch,
+# hline, vline, move, clrtoeol, erase, clear, derwin, getmaxyx, getch,
+# timeout, nodelay, keypad, refresh, noutrefresh) plus the few terminal-wide
+# calls that would otherwise go to the curses module (color_pair, init_pair,
+# start_color, curs_set, noecho, doupdate, acs) and input_fd() for the event
+# loop. CursesScreen is the real terminal, FrameBuffer draws into memory.
+
+# VT100 line drawing characters behind curses' ACS_* constants, and how they look
+ACS_CHARS = {
+    "HLINE": ("q", "─"), "VLINE": ("x", "│"),
+    "ULCORNER": ("l", "┌"), "URCORNER": ("k", "┐"),
+    "LLCORNER": ("m", "└"), "LRCORNER": ("j", "┘"),
+}
+ALTCHARSET_GLYPHS = {ord(letter): glyph for letter, glyph in ACS_CHARS.values()}
+
+
+class CursesScreen:
+    """The Screen interface on a real terminal
+
+    The window's own methods are bound straight onto the instance, so
+    drawing costs exactly what it did when the UIs called stdscr.
+    """
+
+    WINDOW_METHODS = ("addstr", "addch", "hline", "vline", "move", "clrtoeol", "erase", "clear", "derwin",
+                      "getmaxyx", "getch", "timeout", "nodelay", "keypad", "refresh", "noutrefresh")
+
+    def __init__(self, window):
+        self.window = window
+        for name in self.WINDOW_METHODS:
+            setattr(self, name, getattr(window, name))
+        self.color_pair = curses.color_pair
+        self.init_pair = curses.init_pair
+        self.start_color = curses.start_color
+        self.curs_set = curses.curs_set
+        self.noecho = curses.noecho
+        self.doupdate = curses.doupdate
+
+    def acs(self, name):
+        """curses.ACS_<name>, which only exists once curses is initialised"""
+        return getattr(curses, "ACS_" + name)
+
+    def input_fd(self):
+        return sys.stdin.fileno()
+
+
+class FrameBuffer:
+    """The Screen interface in memory, for running the UIs without a terminal
+
+    Cells hold (character, attributes). Drawing goes to the virtual screen,
+    doupdate() compares it with what the terminal would be showing and
+    counts the bytes a VT100-style terminal would be sent for the difference:
+    cursor moves, attribute changes and characters. curses optimises a
+    little better, so bytes_emitted is an estimate, but it moves with the
+    real number. Keys come from press(), through a pipe so the event loop
+    can watch input_fd() as it would stdin.
+    """
+
+    def __init__(self, height=30, width=90):
+        self.height = height
+        self.width = width
+        blank = (" ", 0)
+        self.cells = [[blank] * width for _ in range(height)]  # What has been drawn
+        self.shown = [[blank] * width for _ in range(height)]  # What the terminal shows
+        self.cursor = (0, 0)
+        self.pairs = {0: (curses.COLOR_WHITE, curses.COLOR_BLACK)}
+        self.keys = []
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        self.delay = -1  # Milliseconds getch() waits, -1 forever, as window.timeout()
+        self.clear_pending = False
+
+        self.cells_written = 0
+        self.bytes_emitted = 0
+        self.updates = 0
+
+    # Terminal-wide calls
+
+    def color_pair(self, number):
+        return (number << 8) & curses.A_COLOR  # Where curses keeps the pair number
+
+    def init_pair(self, number, foreground, background):
+        self.pairs[number] = (foreground, background)
+
+    def start_color(self):
+        pass
+
+    def curs_set(self, visibility):
+        pass
+
+    def noecho(self):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def acs(self, name):
+        return curses.A_ALTCHARSET | ord(ACS_CHARS[name][0])
+
+    # Drawing
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def put(self, y, x, char, attr):
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("write outside the screen")
+        self.cells[y][x] = (char, attr)
+        self.cells_written += 1
+
+    def addstr(self, y, x, text, attr=0):
+        end = x + len(text)
+        if 0 <= y < self.height and 0 <= x and end <= self.width:
+            # Fits on the row, the usual case
+            self.cells[y][x:end] = [(char, attr) for char in text]
+            self.cells_written += len(text)
+            self.cursor = (y, end) if end < self.width else (y + 1, 0)  # Where the slow path leaves it
+            return
+        # Wraps at the right edge and fails past the last cell, as curses does
+        for char in text:
+            self.put(y, x, char, attr)
+            x += 1
+            if x == self.width:
+                y, x = y + 1, 0
+        self.cursor = (y, x)
+
+    def addch(self, y, x, ch, attr=0):
+        if isinstance(ch, str):
+            ch = ord(ch)
+        char = ch & curses.A_CHARTEXT
+        attr |= ch & ~curses.A_CHARTEXT
+        self.put(y, x, chr(char), attr)
+        self.cursor = (y, min(x + 1, self.width - 1))
+
+    def hline(self, y, x, ch, count):
+        for i in range(min(count, self.width - x)):
+            self.addch(y, x + i, ch)
+
+    def vline(self, y, x, ch, count):
+        for i in range(min(count, self.height - y)):
+            self.addch(y + i, x, ch)
+
+    def move(self, y, x):
+        self.cursor = (y, x)
+
+    def clrtoeol(self):
+        y, x = self.cursor
+        self.cells[y][x:] = [(" ", 0)] * (self.width - x)
+
+    def erase(self):
+        self.cells = [[(" ", 0)] * self.width for _ in range(self.height)]
+
+    def clear(self):
+        self.erase()
+        self.clear_pending = True  # Like curses, the next update repaints everything
+
+    def derwin(self, height, width, y, x):
+        return SubWindow(self, height, width, y, x)
+
+    # Output
+
+    def refresh(self):
+        self.doupdate()
+
+    def noutrefresh(self):
+        pass  # There is only the one window, doupdate() does the work
+
+    def doupdate(self):
+        sent = 0
+        if self.clear_pending:
+            sent += len("\x1b[H\x1b[2J")
+            self.shown = [[(" ", 0)] * self.width for _ in range(self.height)]
+            self.clear_pending = False
+        attr = None
+        at = None  # Where the terminal's cursor is after the last character
+        for y, (row, shown) in enumerate(zip(self.cells, self.shown)):
+            if row == shown:
+                continue
+            for x, cell in enumerate(row):
+                if cell == shown[x]:
+                    continue
+                if at != (y, x):
+                    sent += len(f"\x1b[{y + 1};{x + 1}H")
+                if cell[1] != attr:
+                    sent += len(self.sgr(cell[1], attr))
+                    attr = cell[1]
+                sent += len(cell[0].encode("utf-8"))
+                at = (y, x + 1)
+            self.shown[y] = list(row)
+        if sent:
+            self.bytes_emitted += sent
+            self.updates += 1
+
+    def sgr(self, attr, previous):
+        """The escape sequence that switches the terminal to attr"""
+        codes = ["0"]
+        if attr & curses.A_BOLD:
+            codes.append("1")
+        if attr & curses.A_REVERSE:
+            codes.append("7")
+        foreground, background = self.pairs.get((attr & curses.A_COLOR) >> 8, self.pairs[0])
+        codes += [f"3{foreground}", f"4{background}"]
+        sequence = f"\x1b[{';'.join(codes)}m"
+        # The line drawing set is switched separately from the other attributes
+        if (attr ^ (previous or 0)) & curses.A_ALTCHARSET:
+            sequence += "\x1b(0" if attr & curses.A_ALTCHARSET else "\x1b(B"
+        return sequence
+
+    def lines(self):
+        """The screen as text, line drawing characters as box drawing glyphs"""
+        return [
+            "".join(ALTCHARSET_GLYPHS.get(ord(char), char) if attr & curses.A_ALTCHARSET else char
+                    for char, attr in row)
+            for row in self.cells
+        ]
+
+    # Input
+
+    def press(self, *keys):
+        """Queue keys for getch(), as key codes or strings of characters"""
+        for key in keys:
+            codes = [ord(char) for char in key] if isinstance(key, str) else [key]
+            self.keys.extend(codes)
+            os.write(self.wake_write, b"k" * len(codes))
+
+    def input_fd(self):
+        return self.wake_read
+
+    def nodelay(self, flag):
+        self.delay = 0 if flag else -1
+
+    def timeout(self, delay):
+        self.delay = delay
+
+    def getch(self):
+        if not self.keys and self.delay != 0:
+            select.select([self.wake_read], [], [], None if self.delay < 0 else self.delay / 1000)
+        if not self.keys:
+            return curses.ERR
+        os.read(self.wake_read, 1)
+        return self.keys.pop(0)
+
+    def close(self):
+        os.close(self.wake_read)
+        os.close(self.wake_write)
+
+
+class SubWindow:
+    """FrameBuffer's derwin(), only what WallScreen uses it for"""
+
+    def __init__(self, parent, height, width, y, x):
+        self.parent = parent
+        self.height, self.width, self.y, self.x = height, width, y, x
+
+    def erase(self):
+        for row in self.parent.cells[self.y:self.y + self.height]:
+            row[self.x:self.x + self.width] = [(" ", 0)] * self.width
+
+    def syncup(self):
+        pass  # Drawing already went straight to the parent
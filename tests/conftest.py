@@ -0,0 +1,35 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quote_journal
+from quote_store import open_store
+
+
+@pytest.fixture
+def quote_dir(tmp_path, monkeypatch):
+    """A directory with empty quote files, the stores work relative to the current one"""
+    monkeypatch.chdir(tmp_path)
+    for path in (quote_journal.QUOTES_FILE, quote_journal.PENDING_QUOTES_FILE, quote_journal.REMOVED_QUOTES_FILE):
+        with open(path, 'w') as f:
+            json.dump([], f)
+    quote_journal._snapshot_cache.clear()
+    yield tmp_path
+    quote_journal.wait_for_compaction()
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, quote_dir):
+    """Each backend in turn, so every test that uses it checks they behave the same"""
+    store = open_store(request.param)
+    yield store
+    store.close()
+
+
+def make_quotes(count, text="quote"):
+    return [{"name": f"Name {i}", "quote": f"{text} {i}"} for i in range(count)]
@@ -0,0 +1,58 @@
+import random
+
+from quote_deck import QuoteDeck
+from conftest import make_quotes
+
+
+def key(quote):
+    return quote["name"], quote["quote"]
+
+
+def test_each_cycle_deals_every_quote_once():
+    quotes = make_quotes(20)
+    deck = QuoteDeck(quotes, rng=random.Random(1))
+    for _ in range(5):
+        cycle = [key(deck.draw()) for _ in range(len(quotes))]
+        assert sorted(cycle) == sorted(map(key, quotes))
+
+
+def test_no_repeat_across_cycles():
+    deck = QuoteDeck(make_quotes(3), rng=random.Random(2))
+    drawn = [key(deck.draw()) for _ in range(300)]
+    assert all(a != b for a, b in zip(drawn, drawn[1:]))
+
+
+def test_changes_mid_cycle_keep_what_was_shown():
+    quotes = make_quotes(10)
+    deck = QuoteDeck(quotes, rng=random.Random(3))
+    shown = [deck.draw() for _ in range(4)]
+    undealt = [quote for quote in quotes if quote not in shown]
+    deck.remove(undealt.pop())
+    deck.remove(shown.pop())
+    added = make_quotes(2, text="new")
+    for quote in added + [shown[0]]:  # Already in the deck, nothing changes
+        deck.add(quote)
+
+    rest = [deck.draw() for _ in range(len(undealt) + len(added))]
+    assert sorted(map(key, rest)) == sorted(map(key, undealt + added))
+    assert deck.draw() not in rest[-1:]  # A new cycle, not starting with the last quote
+
+
+def test_sync_keeps_the_cycle():
+    quotes = make_quotes(8)
+    deck = QuoteDeck(quotes, rng=random.Random(4))
+    shown = {key(deck.draw()) for _ in range(3)}
+    kept = quotes[2:] + make_quotes(1, text="new")
+    deck.sync(kept)
+    assert len(deck) == len(kept)
+    unshown = {key(quote) for quote in kept} - shown
+    rest = {key(deck.draw()) for _ in range(len(unshown))}
+    assert rest == unshown
+
+
+def test_empty_deck():
+    deck = QuoteDeck()
+    assert deck.draw() is None
+    deck.add(make_quotes(1)[0])
+    assert deck.draw() == make_quotes(1)[0]
+    assert deck.draw() == make_quotes(1)[0]
@@ -0,0 +1,64 @@
+import os
+
+import quote_journal
+from quote_journal import (QUOTES_FILE, PENDING_QUOTES_FILE, REMOVED_QUOTES_FILE, JOURNAL_FILE, COMPACTING_FILE,
+                           JournalReader, compact_journal, load_snapshot, load_state, record_events)
+from conftest import make_quotes
+
+
+def test_replay_matches_after_compaction(quote_dir):
+    quotes = make_quotes(5)
+    record_events("submitted", quotes)
+    record_events("approved", quotes[:2])
+    record_events("removed", quotes[4:])
+    before = load_state()
+    assert before[PENDING_QUOTES_FILE] == quotes[2:4]
+
+    compact_journal()
+    assert not os.path.exists(JOURNAL_FILE)
+    assert load_state() == before
+    assert load_snapshot(QUOTES_FILE) == quotes[:2]
+    assert load_snapshot(REMOVED_QUOTES_FILE) == quotes[4:]
+
+
+def test_interrupted_compaction_is_replayed_in_order(quote_dir):
+    first, second = make_quotes(2)
+    record_events("submitted", [first, second])
+    os.rename(JOURNAL_FILE, COMPACTING_FILE)  # As if compaction stopped before writing the snapshots
+    record_events("approved", [first])
+    record_events("removed", [second])
+
+    state = load_state()
+    assert state[QUOTES_FILE] == [first]
+    assert state[REMOVED_QUOTES_FILE] == [second]
+
+    compact_journal()  # Picks up the old journal, the new one stays for next time
+    assert not os.path.exists(COMPACTING_FILE)
+    assert load_snapshot(PENDING_QUOTES_FILE) == [first, second]
+    assert load_state() == state
+
+
+def test_reader_follows_compaction(quote_dir):
+    quotes = make_quotes(4)
+    reader = JournalReader()
+    record_events("submitted", quotes)
+    assert reader.refresh()
+    assert reader.quotes(PENDING_QUOTES_FILE) == quotes
+    cursor = reader.change_count()
+
+    compact_journal()
+    record_events("approved", quotes[:1])
+    reader.refresh()
+    assert reader.quotes(QUOTES_FILE) == quotes[:1]
+    assert reader.quotes(PENDING_QUOTES_FILE) == quotes[1:]
+    assert reader.change_count() > cursor
+    assert not reader.refresh()  # Nothing new
+
+
+def test_compaction_starts_past_the_threshold(quote_dir, monkeypatch):
+    monkeypatch.setattr(quote_journal, "COMPACT_THRESHOLD", 200)
+    quotes = make_quotes(10)
+    record_events("submitted", quotes)
+    quote_journal.wait_for_compaction()
+    assert load_snapshot(PENDING_QUOTES_FILE) == quotes
+    assert load_state()[PENDING_QUOTES_FILE] == quotes
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from quote_search import QuoteIndex
+
+QUOTES = [
+    {"name": "Ada Lovelace", "quote": "The engine weaves algebra"},
+    {"name": "Grace Hopper", "quote": "Ships are built for the sea"},
+    {"name": "Alan Kay", "quote": "Simple things should be simple"},
+    {"name": "Ada 12", "quote": "Simplicity is the future"},
+]
+
+
+@pytest.fixture
+def index(store):
+    store.submit_many(QUOTES)
+    store.set_status_many(QUOTES[:2], "approved")
+    index = QuoteIndex(store)
+    index.update()
+    return index
+
+
+def names(results):
+    return sorted(quote["name"] for quote, _ in results)
+
+
+def test_words_match_as_prefixes(index):
+    assert names(index.search("ada")) == ["Ada 12", "Ada Lovelace"]
+    assert names(index.search("simpl")) == ["Ada 12", "Alan Kay"]
+    assert names(index.search("1")) == ["Ada 12"]
+    assert index.search("zebra") == []
+    assert index.search("   ") == []
+
+
+def test_every_word_must_match(index):
+    assert names(index.search("ada simp")) == ["Ada 12"]
+    assert names(index.search("SIMPLE alan")) == ["Alan Kay"]
+    assert index.search("grace algebra") == []
+
+
+def test_results_carry_the_status(index):
+    assert index.search("grace") == [(QUOTES[1], "approved")]
+    assert index.search("kay") == [(QUOTES[2], "pending")]
+
+
+def test_follows_the_store(store, index):
+    store.set_status(QUOTES[2], "removed")
+    store.submit({"name": "Linus", "quote": "Talk is cheap"})
+    index.update()
+    assert index.search("kay") == [(QUOTES[2], "removed")]
+    assert names(index.search("cheap")) == ["Linus"]
+
+
+def test_limit(index):
+    assert len(index.search("a", limit=2)) == 2
+
+
+def test_background_build(store):
+    store.submit_many(QUOTES)
+    index = QuoteIndex(store)
+    ready = threading.Event()
+    index.on_ready = ready.set
+    index.start()
+    assert ready.wait(10)
+    assert index.ready()
+    store.submit({"name": "Late", "quote": "added while building"})
+    index.update()
+    assert names(index.search("ada")) == ["Ada 12", "Ada Lovelace"]
+    assert names(index.search("late build")) == ["Late"]
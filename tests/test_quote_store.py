@@ -0,0 +1,87 @@
+from conftest import make_quotes
+
+
+def keys(quotes):
+    return [(quote["name"], quote["quote"]) for quote in quotes]
+
+
+def test_submit_rejects_duplicates(store):
+    first, second = make_quotes(2)
+    assert store.submit(first) is True
+    assert store.submit(first) is False
+    assert store.submit_many([second, second, first]) == [True, False, False]
+    assert store.quotes("pending") == [first, second]
+    assert store.count("pending") == 2
+
+
+def test_page_matches_list_slices(store):
+    quotes = make_quotes(50)
+    store.submit_many(quotes)
+    store.set_status_many(quotes[::3], "approved")
+    for status in ("pending", "approved", "removed"):
+        full = store.quotes(status)
+        for start in (0, 1, 5, 16, 17, 30, 33, 34, 49, 50, 60):
+            for count in (1, 10, 20):
+                assert store.page(status, start, count) == full[start:start + count], (status, start, count)
+
+
+def test_page_follows_scrolling_and_writes(store):
+    quotes = make_quotes(100)
+    store.submit_many(quotes)
+
+    def check(start, count=10):
+        assert store.page("pending", start, count) == store.quotes("pending")[start:start + count], start
+
+    # Down a row at a time, a page at a time, back up, then past the end and back
+    for start in list(range(0, 15)) + [25, 35, 45, 35, 25, 24, 23, 95, 99, 100, 120, 90, 80]:
+        check(start)
+    store.set_status_many(quotes[20:40], "approved")
+    for start in (70, 80, 79, 60, 50, 0):
+        check(start)
+    assert store.page("pending", store.count("pending"), 10) == []
+
+
+def test_set_status_many_only_moves_from_status(store):
+    quotes = make_quotes(6)
+    store.submit_many(quotes)
+    store.set_status_many(quotes[:2], "approved")
+    store.set_status_many(quotes[:4], "removed", from_status="pending")
+    assert store.quotes("approved") == quotes[:2]
+    assert store.quotes("removed") == quotes[2:4]
+    assert store.quotes("pending") == quotes[4:]
+    assert [store.count(status) for status in ("pending", "approved", "removed")] == [2, 2, 2]
+
+
+def test_set_status_ignores_unknown_quotes(store):
+    known, unknown, other = make_quotes(3)
+    store.submit(known)
+    store.set_status(unknown, "approved")
+    store.set_status_many([other, known], "approved")
+    assert store.quotes("approved") == [known]
+    assert not store.contains(unknown)
+    assert store.count("pending") == 0
+
+
+def test_changes_since(store):
+    first, second = make_quotes(2)
+    cursor = store.change_cursor()
+    store.submit(first)
+    store.submit(second)
+    store.set_status(first, "approved")
+    store.set_status(second, "removed")
+    store.set_status(second, "pending")  # Back where it started, only the add shows
+
+    diff, cursor = store.changes_since(cursor)
+    assert sorted(keys(quote for quote, _ in diff.added)) == keys([first, second])
+    assert dict((quote["name"], status) for quote, status in diff.added) == {
+        first["name"]: "approved", second["name"]: "pending"}
+    assert diff.moved == [] and diff.removed == []
+
+    store.set_status(first, "removed")
+    diff, cursor = store.changes_since(cursor)
+    assert diff.moved == [(first, "approved", "removed")]
+    assert diff.left("approved") == [first]
+    assert diff.entered("removed") == [first]
+
+    diff, _ = store.changes_since(cursor)
+    assert diff == ([], [], [])
@@ -0,0 +1,49 @@
+import curses
+
+from terminal import FrameBuffer
+
+
+def test_addstr_up_to_the_last_column():
+    screen = FrameBuffer(3, 10)
+    screen.addstr(1, 6, "abcd", curses.A_BOLD)
+    assert screen.lines()[1] == "      abcd"
+    assert screen.cells[1][9] == ("d", curses.A_BOLD)
+    assert screen.cells_written == 4
+
+
+def test_addstr_wraps_and_fails_past_the_screen():
+    screen = FrameBuffer(2, 4)
+    screen.addstr(0, 2, "abcd")
+    assert screen.lines() == ["  ab", "cd  "]
+    try:
+        screen.addstr(1, 2, "xyz")
+    except curses.error:
+        pass
+    else:
+        raise AssertionError("wrote past the last cell")
+
+
+def test_doupdate_only_sends_what_changed():
+    screen = FrameBuffer(5, 20)
+    screen.addstr(2, 3, "hello")
+    screen.doupdate()
+    first = screen.bytes_emitted
+    assert first > len("hello")
+
+    screen.addstr(2, 3, "hello")  # Same text again
+    screen.doupdate()
+    assert screen.bytes_emitted == first
+    assert screen.updates == 1
+
+    screen.addstr(2, 3, "hallo")
+    screen.doupdate()
+    assert 0 < screen.bytes_emitted - first < first
+
+
+def test_keys_arrive_through_getch():
+    screen = FrameBuffer()
+    screen.nodelay(True)
+    assert screen.getch() == curses.ERR
+    screen.press("ab", curses.KEY_DOWN)
+    assert [screen.getch() for _ in range(4)] == [ord("a"), ord("b"), curses.KEY_DOWN, curses.ERR]
+    screen.close()
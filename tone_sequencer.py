@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import collections
+import threading
+import time
+
+import metrics
+
+# One step of a tune, duty 0 is a rest
+Note = collections.namedtuple("Note", "frequency duty duration")
+
+TUNE_TIME = metrics.histogram("retro_wall_tune_seconds", "Time the sequencer thread spent playing each tune")
+# From play() to the tune starting, long when tunes pile up behind each other
+TUNE_DELAY = metrics.histogram("retro_wall_tune_delay_seconds", "How long tunes waited before playing")
+
+
+class ToneSequencer:
+    """Plays note sequences on a PWM buzzer from its own thread
+
+    play() only queues the sequence and returns, so the UI never sleeps
+    through a tune. A sequence identical to one that is already waiting or
+    playing is merged into it instead of queueing up a burst of repeats, and
+    preempt=True cuts off whatever is playing and drops the backlog.
+
+    `device` is anything with gpiozero's PWMOutputDevice `frequency` and
+    `value` attributes. Without one, the sequence's fallback callable (e.g. a
+    terminal bell) runs on the sequencer thread instead.
+    """
+
+    def __init__(self, device=None):
+        self.device = device
+        self.pending = collections.deque()  # (notes, fallback, queued_at) waiting to play
+        self.playing = None
+        self.condition = threading.Condition()
+        self.interrupted = threading.Event()
+        self.stopped = False
+        self.thread = None
+
+    def play(self, notes, preempt=False, fallback=None):
+        notes = tuple(notes)
+        with self.condition:
+            if self.stopped:
+                return
+            if preempt:
+                self.pending.clear()
+                self.interrupted.set()
+            elif notes == self.playing or any(queued == notes for queued, _, _ in self.pending):
+                return  # Same tune already on its way, don't stack repeats
+            self.pending.append((notes, fallback, time.perf_counter()))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                notes, fallback, queued_at = self.pending.popleft()
+                self.playing = notes
+                self.interrupted.clear()
+
+            start = time.perf_counter()
+            TUNE_DELAY.observe(start - queued_at)
+            try:
+                if self.device is not None:
+                    self.play_notes(notes)
+                elif fallback is not None:
+                    fallback()
+            finally:
+                TUNE_TIME.observe(time.perf_counter() - start)
+                with self.condition:
+                    self.playing = None
+
+    def play_notes(self, notes):
+        try:
+            for note in notes:
+                if note.duty > 0:
+                    self.device.frequency = note.frequency
+                self.device.value = note.duty
+                # Sleep through the note, but wake up at once if preempted
+                if self.interrupted.wait(note.duration):
+                    return
+        finally:
+            self.device.value = 0
+
+    def stop(self):
+        """Silence the buzzer and end the thread, dropping anything still queued"""
+        with self.condition:
+            self.stopped = True
+            self.pending.clear()
+            self.interrupted.set()
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()